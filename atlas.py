@@ -0,0 +1,86 @@
+"""
+Treasure Hunt - Pirate Adventure
+Author: Matheus Abrahao
+Texture atlas: packs the animation frames into a single sprite sheet
+
+Rebuild the sheet after adding or changing frames:
+    python atlas.py
+"""
+
+import json
+import os
+
+import pygame
+from pygame import Rect
+
+from engine import SPRITE_FRAMES
+
+ATLAS_NAME = 'atlas'
+ATLAS_WIDTH = 1024
+PADDING = 1
+IMAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'images')
+
+def pack(sizes, max_width=ATLAS_WIDTH, padding=PADDING):
+    """Shelf-pack (name, width, height) boxes, tallest first, into rows"""
+    rects = {}
+    x = y = shelf_height = sheet_width = 0
+    for name, width, height in sorted(sizes, key=lambda size: -size[2]):
+        if x + width > max_width:
+            # Start a new shelf below the current one
+            x = 0
+            y += shelf_height + padding
+            shelf_height = 0
+        rects[name] = (x, y, width, height)
+        x += width + padding
+        shelf_height = max(shelf_height, height)
+        sheet_width = max(sheet_width, x - padding)
+    return rects, (sheet_width, y + shelf_height)
+
+def build_atlas(frames=SPRITE_FRAMES, images_dir=IMAGES_DIR, name=ATLAS_NAME):
+    """Pack every frame into <name>.png with a <name>.json frame-rect index"""
+    surfaces = {frame: pygame.image.load(os.path.join(images_dir, frame + '.png'))
+                for frame in frames}
+    rects, size = pack([(frame, *surface.get_size()) for frame, surface in surfaces.items()])
+    sheet = pygame.Surface(size, pygame.SRCALPHA)
+    for frame, surface in surfaces.items():
+        sheet.blit(surface, rects[frame][:2])
+    pygame.image.save(sheet, os.path.join(images_dir, name + '.png'))
+    # One frame per line, in animation order, so diffs stay readable
+    lines = [f'  {json.dumps(frame)}: {json.dumps(list(rects[frame]))}' for frame in frames]
+    with open(os.path.join(images_dir, name + '.json'), 'w') as f:
+        f.write('{\n "image": %s,\n "frames": {\n%s\n }\n}\n'
+                % (json.dumps(name + '.png'), ',\n'.join(lines)))
+    return rects, size
+
+class SpriteAtlas:
+    """One sheet surface with a subsurface view for every packed frame"""
+    def __init__(self, sheet, rects):
+        self.sheet = sheet
+        self.rects = rects
+        self.frames = {frame: sheet.subsurface(Rect(rect)) for frame, rect in rects.items()}
+
+    def __contains__(self, frame):
+        return frame in self.frames
+
+    def get(self, frame):
+        return self.frames[frame]
+
+    def converted(self):
+        """Copy with the sheet in the display's pixel format, once a display exists"""
+        return SpriteAtlas(self.sheet.convert_alpha(), self.rects)
+
+def load_atlas(images_dir=IMAGES_DIR, name=ATLAS_NAME, convert=True):
+    """Load the packed sheet and its index, None when the atlas was never built"""
+    index_path = os.path.join(images_dir, name + '.json')
+    if not os.path.exists(index_path):
+        return None
+    with open(index_path) as f:
+        index = json.load(f)
+    sheet = pygame.image.load(os.path.join(images_dir, index['image']))
+    if convert and pygame.display.get_surface() is not None:
+        sheet = sheet.convert_alpha()
+    return SpriteAtlas(sheet, index['frames'])
+
+if __name__ == '__main__':
+    rects, size = build_atlas()
+    print(f"Packed {len(rects)} frames into {ATLAS_NAME}.png ({size[0]}x{size[1]})")
@@ -0,0 +1,103 @@
+"""
+Treasure Hunt - Pirate Adventure
+Author: Matheus Abrahao
+Pygame Zero audio adapter for the headless engine
+"""
+
+import io
+import os
+
+import pygame
+from pgzero import loaders, music
+from pgzero.loaders import sounds
+
+from engine import SOUND_NAMES, MUSIC_NAMES
+
+MUSIC_EXTENSION = '.mp3'
+SFX_CHANNELS = 4  # Mixer channels reserved for effects
+COALESCE_MS = 60  # Repeats of one effect closer than this play once
+
+class PgzeroAudio:
+    """Plays engine sound requests on a fixed pool of mixer channels
+
+    Identical effects requested within COALESCE_MS collapse into one play,
+    and a sound or track that failed once is not retried.
+    """
+    def __init__(self, preloader=None, channels=SFX_CHANNELS, coalesce_ms=COALESCE_MS):
+        self.coalesce_ms = coalesce_ms
+        self.sounds = {}
+        self.last_played = {}
+        # Names that failed to load or play, reported once
+        self.failed = set()
+        self.channels = []
+        self.next_channel = 0
+        if pygame.mixer.get_init():
+            # Reserved channels are never picked by Sound.play, so effects own them
+            pygame.mixer.set_num_channels(max(pygame.mixer.get_num_channels(), channels))
+            pygame.mixer.set_reserved(channels)
+            self.channels = [pygame.mixer.Channel(i) for i in range(channels)]
+        # Compressed music files kept in memory, the mixer decodes them as it streams
+        self.music_data = {}
+        if preloader is not None:
+            for name in SOUND_NAMES:
+                preloader.add(lambda name=name: sounds.load(name),
+                              lambda sound, name=name: self.sounds.__setitem__(name, sound))
+            for name in MUSIC_NAMES:
+                preloader.add(lambda name=name: self.read_music(name),
+                              lambda data, name=name: self.music_data.__setitem__(name, data))
+
+    def read_music(self, name):
+        with open(os.path.join(loaders.root, 'music', name + MUSIC_EXTENSION), 'rb') as f:
+            return f.read()
+
+    def fail(self, name, error):
+        self.failed.add(name)
+        print(f"Error playing {name}: {error}")
+
+    def sound(self, name):
+        sound = self.sounds.get(name)
+        if sound is None:
+            sound = self.sounds[name] = getattr(sounds, name)
+        return sound
+
+    def channel(self):
+        """A free effects channel, or the one that started playing longest ago"""
+        channels = self.channels
+        for i in range(len(channels)):
+            index = (self.next_channel + i) % len(channels)
+            if not channels[index].get_busy():
+                break
+        else:
+            index = self.next_channel
+        self.next_channel = (index + 1) % len(channels)
+        return channels[index]
+
+    def play_sound(self, name):
+        if name in self.failed or not self.channels:
+            return
+        now = pygame.time.get_ticks()
+        last = self.last_played.get(name)
+        if last is not None and now - last < self.coalesce_ms:
+            return
+        self.last_played[name] = now
+        try:
+            self.channel().play(self.sound(name))
+        except Exception as e:
+            self.fail(name, e)
+
+    def play_music(self, name):
+        if name in self.failed:
+            return
+        try:
+            data = self.music_data.get(name)
+            if data is None:
+                music.play(name)
+                return
+            # The name hint tells SDL the format of the in-memory file
+            pygame.mixer.music.load(io.BytesIO(data), name + MUSIC_EXTENSION)
+            pygame.mixer.music.play(-1)
+        except Exception as e:
+            self.fail(name, e)
+
+    def stop_music(self):
+        music.stop()
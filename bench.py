@@ -0,0 +1,203 @@
+"""
+Treasure Hunt - Pirate Adventure
+Author: Matheus Abrahao
+Benchmark harness: times Game.update headlessly and the renderer off-screen
+
+    python bench.py                                # stock, 100, 1000 and 10000
+    python bench.py --scales stock 1000 --json before.json
+    python bench.py --compare before.json          # exit 1 on >20% slowdowns
+    python bench.py --scales 10000 --world 20000x15000  # scrolling island map
+    python bench.py --no-draw --collision swept    # cost of swept collisions
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+# No window and no sound card needed, the draw path renders off-screen
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame
+
+from engine import WIDTH, HEIGHT, MAX_PARTICLES, Game
+from level import DEFAULT_LEVEL, load_level
+from spatial import COLLISION_MODES
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SCALES = ['stock', '100', '1000', '10000']
+STOCK_PARTICLES = 10  # About one pickup burst
+SEED = 1234
+MOVE_EVERY = 45  # Ticks between scripted click-to-move targets
+WARMUP_TICKS = 30
+
+def scenario_counts(scale):
+    """Entity counts for a scale name: 'stock' or a number applied to every kind"""
+    if scale == 'stock':
+        level = load_level(DEFAULT_LEVEL)
+        return {'enemies': len(level.territories), 'coins': len(level.coins),
+                'projectiles': level.projectile_count, 'particles': STOCK_PARTICLES}
+    count = int(scale)
+    return {'enemies': count, 'coins': count, 'projectiles': count, 'particles': count}
+
+class Scenario:
+    """A seeded round with scripted input that keeps the entity counts steady"""
+    def __init__(self, counts, world=(WIDTH, HEIGHT), seed=SEED, collision_mode='discrete'):
+        self.counts = counts
+        self.world = world
+        self.game = Game(seed=seed, enemy_count=counts['enemies'], coin_count=counts['coins'],
+                         projectile_count=counts['projectiles'],
+                         particle_capacity=max(MAX_PARTICLES, counts['particles']),
+                         world_width=world[0], world_height=world[1],
+                         collision_mode=collision_mode)
+        self.game.sfx_on = self.game.music_on = False
+        self.input_rng = random.Random(seed)
+        self.game.start_round()
+
+    def tick(self):
+        game = self.game
+        if game.state != "playing":
+            game.start_round()
+        if game.tick % MOVE_EVERY == 0:
+            # Short hops around the player, so the camera scrolls on big maps
+            game.move_player(game.player.x + self.input_rng.randint(-WIDTH // 2, WIDTH // 2),
+                             game.player.y + self.input_rng.randint(-HEIGHT // 2, HEIGHT // 2))
+        # Top the particle pool back up to the scenario's count
+        missing = self.counts['particles'] - len(game.particles)
+        if missing > 0:
+            game.add_particles(game.player.x, game.player.y, (255, 215, 0), missing)
+        game.update()
+
+def summarize(samples_ms):
+    """Per-repeat ms/frame samples reduced to comparable statistics"""
+    median = statistics.median(samples_ms)
+    return {
+        'ms_median': median,
+        'ms_min': min(samples_ms),
+        'ms_max': max(samples_ms),
+        'ms_stdev': statistics.stdev(samples_ms) if len(samples_ms) > 1 else 0.0,
+        'per_second': 1000.0 / median if median else 0.0,
+        'samples_ms': samples_ms
+    }
+
+def bench_update(counts, world, ticks, repeats, collision_mode='discrete'):
+    samples = []
+    for _ in range(repeats):
+        scenario = Scenario(counts, world, collision_mode=collision_mode)
+        for _ in range(WARMUP_TICKS):
+            scenario.tick()
+        start = time.perf_counter()
+        for _ in range(ticks):
+            scenario.tick()
+        samples.append((time.perf_counter() - start) * 1000 / ticks)
+    return summarize(samples)
+
+def bench_draw(counts, world, frames, repeats, dirty_mode=False):
+    from pgzero import loaders
+    from pgzero.screen import Screen
+    from render import Renderer
+
+    if pygame.display.get_surface() is None:
+        pygame.display.set_mode((WIDTH, HEIGHT))
+        loaders.set_root(ROOT)
+    target = Screen(pygame.Surface((WIDTH, HEIGHT)))
+    samples = []
+    for _ in range(repeats):
+        scenario = Scenario(counts, world)
+        renderer = Renderer(scenario.game, dirty_mode=dirty_mode)
+        for _ in range(WARMUP_TICKS):
+            scenario.tick()
+            renderer.draw(target)
+        elapsed = 0.0
+        for _ in range(frames):
+            scenario.tick()
+            start = time.perf_counter()
+            renderer.draw(target)
+            elapsed += time.perf_counter() - start
+        samples.append(elapsed * 1000 / frames)
+    return summarize(samples)
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results, baseline, threshold):
+    """Print the change against a previous run, returns True on any regression"""
+    previous = {(r['scenario'], path): r[path]['ms_median']
+                for r in baseline['results'] for path in ('update', 'draw') if path in r}
+    regressed = False
+    for result in results:
+        for path in ('update', 'draw'):
+            old = previous.get((result['scenario'], path))
+            if path not in result or not old:
+                continue
+            change = result[path]['ms_median'] / old - 1
+            flag = ''
+            if change > threshold:
+                flag = '  REGRESSION'
+                regressed = True
+            print(f"{result['scenario']:>8} {path:<6} {old:9.3f} -> "
+                  f"{result[path]['ms_median']:9.3f} ms ({change:+.1%}){flag}")
+    return regressed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark Game.update and the renderer')
+    parser.add_argument('--scales', nargs='+', default=SCALES,
+                        help="'stock' or entity counts applied to every kind")
+    parser.add_argument('--ticks', type=int, default=120, help='timed ticks/frames per repeat')
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--world', default=f'{WIDTH}x{HEIGHT}',
+                        help='world size as WIDTHxHEIGHT, larger than the screen scrolls')
+    parser.add_argument('--dirty', action='store_true', help='draw in dirty-rectangle mode')
+    parser.add_argument('--no-draw', action='store_true', help='only time Game.update')
+    parser.add_argument('--collision', choices=COLLISION_MODES, default='discrete',
+                        help='collision mode of the timed updates')
+    parser.add_argument('--json', help='write machine-readable results here')
+    parser.add_argument('--compare', help='previous --json output to compare against')
+    parser.add_argument('--threshold', type=float, default=0.20,
+                        help='median slowdown that counts as a regression')
+    args = parser.parse_args(argv)
+    world = tuple(int(side) for side in args.world.lower().split('x'))
+
+    results = []
+    for scale in args.scales:
+        counts = scenario_counts(scale)
+        result = {'scenario': scale, 'counts': counts, 'world': list(world),
+                  'update': bench_update(counts, world, args.ticks, args.repeats, args.collision)}
+        line = (f"{scale:>8}  update {result['update']['ms_median']:8.3f} ms/tick "
+                f"({result['update']['per_second']:9.0f} ticks/s)")
+        if not args.no_draw:
+            result['draw'] = bench_draw(counts, world, args.ticks, args.repeats, args.dirty)
+            line += f"  draw {result['draw']['ms_median']:8.3f} ms/frame"
+        print(line)
+        results.append(result)
+
+    report = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'ticks': args.ticks,
+        'collision': args.collision,
+        'repeats': args.repeats,
+        'results': results
+    }
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=1)
+    if args.compare:
+        with open(args.compare) as f:
+            if compare(results, json.load(f), args.threshold):
+                return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,34 @@
+"""
+Treasure Hunt - Pirate Adventure
+Author: Matheus Abrahao
+Camera: the screen-sized window into a world that can be larger than the screen
+"""
+
+from pygame import Rect
+
+class Camera:
+    """Viewport that keeps a target centered, clamped to the world bounds"""
+    def __init__(self, width, height, world_width, world_height):
+        self.width = width
+        self.height = height
+        self.world_width = world_width
+        self.world_height = world_height
+        # Top-left corner in world coordinates, whole pixels so blits never shimmer
+        self.x = 0
+        self.y = 0
+
+    @property
+    def covers_world(self):
+        return self.width >= self.world_width and self.height >= self.world_height
+
+    def follow(self, x, y):
+        self.x = max(0, min(self.world_width - self.width, int(x) - self.width // 2))
+        self.y = max(0, min(self.world_height - self.height, int(y) - self.height // 2))
+
+    def viewport(self, margin=0):
+        """Visible part of the world, optionally grown by margin on every side"""
+        return Rect(self.x - margin, self.y - margin,
+                    self.width + 2 * margin, self.height + 2 * margin)
+
+    def to_world(self, x, y):
+        return x + self.x, y + self.y
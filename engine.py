@@ -0,0 +1,1040 @@
+"""
+Treasure Hunt - Pirate Adventure
+Author: Matheus Abrahao
+Headless simulation core: entities, collisions and game states.
+Nothing here touches the screen or the mixer, so it runs without pgzero.
+"""
+
+import hashlib
+import math
+import random
+import struct
+
+import numpy as np
+from pygame import Rect
+
+from camera import Camera
+from events import CoinCollected, EventBus, PlayerHit, PowerUpCollected, Victory
+from flowfield import FlowField
+from level import DEFAULT_LEVEL, load_level
+from pathfinding import NavGrid, Pathfinder
+from profiler import NullProfiler
+from replay import Replay
+from spatial import COLLISION_MODES, SpatialGrid
+
+# Game constants
+TITLE = "Treasure Hunt - Pirate Adventure"
+WIDTH = 800
+HEIGHT = 600
+# Simulation ticks per second, whatever the frame rate: every timer and speed counts ticks
+TICK_RATE = 60
+PLAYER_SPEED = 3
+ENEMY_SPEED = 2
+ENEMY_TURN_TICKS = 2 * TICK_RATE  # Patrolling enemies pick a new heading this often
+INVINCIBLE_TICKS = 2 * TICK_RATE  # After a hit
+POWERUP_TICKS = 5 * TICK_RATE
+# Separate streams so particle effects never shift gameplay randomness
+PARTICLE_STREAM = 1
+ENEMY_STREAM = 2
+MAX_PARTICLES = 2048  # Live particles kept before the oldest are recycled
+# Off-screen enemies move every this many ticks, in steps that long
+OFFSCREEN_ENEMY_INTERVAL = 4
+ACTIVE_MARGIN = 64  # Enemies this close to the viewport still move every tick
+# Fixed seed for the extra positions generated beyond the hand-placed layout
+LAYOUT_SEED = 0
+
+def load_seq(prefix: str, start: int, end: int):
+    """Helper to generate animation frame sequence"""
+    return [f"{prefix}{i}" for i in range(start, end + 1)]
+
+# Animation frame lists, also packed into the sprite atlas by atlas.py
+PLAYER_IDLE_FRAMES = load_seq('player/idle/', 1, 26)
+PLAYER_RUN_FRAMES = load_seq('player/run/', 1, 14)
+ENEMY_RUN_FRAMES = load_seq('enemy/run/', 1, 12)
+SPRITE_FRAMES = PLAYER_IDLE_FRAMES + PLAYER_RUN_FRAMES + ENEMY_RUN_FRAMES
+SOUND_NAMES = ('coin',)
+MUSIC_NAMES = ('soundtrack',)
+
+class Animation:
+    """Frame sequence shared by every entity that plays it, timed by the game tick"""
+    __slots__ = ('frames', 'frame_duration')
+
+    def __init__(self, frames, frame_duration=10):
+        self.frames = frames
+        self.frame_duration = frame_duration
+
+    def frame_at(self, tick):
+        """Frame shown at a game tick, so entities need no counters of their own"""
+        return self.frames[tick // self.frame_duration % len(self.frames)]
+
+# One clock per kind of animation: same-type entities advance in lockstep
+PLAYER_IDLE_ANIMATION = Animation(PLAYER_IDLE_FRAMES, 15)  # 26 idle frames
+PLAYER_RUN_ANIMATION = Animation(PLAYER_RUN_FRAMES, 12)  # 14 run frames
+ENEMY_RUN_ANIMATION = Animation(ENEMY_RUN_FRAMES, 10)  # 12 run frames
+COIN_ANIMATION = Animation(['coin_1', 'coin_2', 'coin_3'], 10)
+POWERUP_ANIMATION = Animation(['powerup_1', 'powerup_2', 'powerup_3'], 8)
+PROJECTILE_ANIMATION = Animation(['projectile_1', 'projectile_2'], 8)
+
+class Player:
+    """Player class with click-to-move movement"""
+    __slots__ = ('x', 'y', 'previous_x', 'previous_y', 'target_x', 'target_y', 'path', 'speed',
+                 'is_moving', 'direction', 'lives', 'invincible', 'invincible_timer',
+                 'powerup_active', 'powerup_timer', 'current_animation')
+    idle_animation = PLAYER_IDLE_ANIMATION
+    run_animation = PLAYER_RUN_ANIMATION
+
+    def __init__(self, x, y):
+        self.reset(x, y)
+
+    def reset(self, x, y):
+        """Back to the start of a round, at (x, y)"""
+        self.x = x
+        self.y = y
+        # Position before the last update, for swept collisions and render interpolation
+        self.previous_x = x
+        self.previous_y = y
+        self.target_x = x
+        self.target_y = y
+        # Waypoints still to walk after the current target
+        self.path = []
+        self.speed = PLAYER_SPEED
+        self.is_moving = False
+        self.direction = 1
+        self.lives = 3
+        self.invincible = False
+        self.invincible_timer = 0
+        self.powerup_active = False
+        self.powerup_timer = 0
+        self.current_animation = self.idle_animation
+
+    def move_to(self, target_x, target_y):
+        self.target_x = target_x
+        self.target_y = target_y
+        self.path = []
+        self.is_moving = True
+
+    def follow(self, waypoints):
+        """Walk through the waypoints in order"""
+        self.move_to(*waypoints[0])
+        self.path = list(waypoints[1:])
+
+    def update(self):
+        self.previous_x = self.x
+        self.previous_y = self.y
+        # Update invincibility
+        if self.invincible:
+            self.invincible_timer -= 1
+            if self.invincible_timer <= 0:
+                self.invincible = False
+
+        # Update powerup
+        if self.powerup_active:
+            self.powerup_timer -= 1
+            if self.powerup_timer <= 0:
+                self.powerup_active = False
+                self.speed = PLAYER_SPEED
+
+        if self.is_moving:
+            dx = self.target_x - self.x
+            dy = self.target_y - self.y
+            distance = math.sqrt(dx*dx + dy*dy)
+            if distance > self.speed:
+                self.x += (dx / distance) * self.speed
+                self.y += (dy / distance) * self.speed
+                self.direction = 1 if dx > 0 else -1
+                self.current_animation = self.run_animation
+            else:
+                self.x = self.target_x
+                self.y = self.target_y
+                if self.path:
+                    self.target_x, self.target_y = self.path.pop(0)
+                else:
+                    self.is_moving = False
+                    self.current_animation = self.idle_animation
+        else:
+            self.current_animation = self.idle_animation
+
+    def activate_powerup(self):
+        """Activate speed powerup"""
+        self.powerup_active = True
+        self.powerup_timer = POWERUP_TICKS
+        self.speed = PLAYER_SPEED * 2
+
+    def take_damage(self):
+        """Player takes damage"""
+        if not self.invincible:
+            self.lives -= 1
+            self.invincible = True
+            self.invincible_timer = INVINCIBLE_TICKS
+            return True
+        return False
+
+class GridBatch:
+    """Struct-of-arrays pool whose slots live in a SpatialGrid, re-bucketed in batches
+
+    The per-tick masks, cells and temporaries go to scratch arrays allocated once up front.
+    """
+    def __init__(self, count, grid):
+        self.count = count
+        self.grid = grid
+        self.x = np.zeros(count)
+        self.y = np.zeros(count)
+        # Positions at the start of the last update, for swept collisions
+        self.previous_x = np.zeros(count)
+        self.previous_y = np.zeros(count)
+        self.cell_x = np.zeros(count, dtype=np.int64)
+        self.cell_y = np.zeros(count, dtype=np.int64)
+        # Scratch space reused every tick instead of temporary arrays
+        self.slots = np.arange(count)
+        self.picked = np.zeros(count, dtype=np.int64)
+        self.mask = np.zeros(count, dtype=bool)
+        self.mask_other = np.zeros(count, dtype=bool)
+        self.scratch = [np.zeros(count) for _ in range(3)]
+        self.next_cell_x = np.zeros(count, dtype=np.int64)
+        self.next_cell_y = np.zeros(count, dtype=np.int64)
+
+    def __len__(self):
+        return self.count
+
+    def changed(self, mask):
+        """View of the scratch index buffer holding the slots set in mask"""
+        k = np.count_nonzero(mask)
+        if not k:
+            return None
+        return np.compress(mask, self.slots, out=self.picked[:k])
+
+    def visible(self, rect):
+        """Indices of the slots within a pygame Rect"""
+        return np.flatnonzero((self.x >= rect.left) & (self.x < rect.right) &
+                              (self.y >= rect.top) & (self.y < rect.bottom))
+
+    def compute_cells(self, cell_x, cell_y):
+        size = self.grid.cell_size
+        scratch = self.scratch[0]
+        np.floor_divide(self.x, size, out=scratch)
+        np.copyto(cell_x, scratch, casting='unsafe')
+        np.floor_divide(self.y, size, out=scratch)
+        np.copyto(cell_y, scratch, casting='unsafe')
+
+    def index_grid(self):
+        self.remember_positions()
+        self.compute_cells(self.cell_x, self.cell_y)
+        self.grid.clear()
+        for i, cell in enumerate(zip(self.cell_x.tolist(), self.cell_y.tolist())):
+            self.grid.insert_cell(i, cell)
+
+    def sync_grid(self):
+        """Re-bucket only the slots that crossed into another cell"""
+        cell_x, cell_y = self.next_cell_x, self.next_cell_y
+        self.compute_cells(cell_x, cell_y)
+        np.not_equal(cell_x, self.cell_x, out=self.mask)
+        np.not_equal(cell_y, self.cell_y, out=self.mask_other)
+        self.mask |= self.mask_other
+        moved = self.changed(self.mask)
+        if moved is not None:
+            for i in moved.tolist():
+                self.grid.move_cell(i, (int(cell_x[i]), int(cell_y[i])))
+        # Swap the double-buffered cell arrays
+        self.cell_x, self.next_cell_x = cell_x, self.cell_x
+        self.cell_y, self.next_cell_y = cell_y, self.cell_y
+
+    def remember_positions(self):
+        np.copyto(self.previous_x, self.x)
+        np.copyto(self.previous_y, self.y)
+
+    def reach(self):
+        """Longest distance along an axis any slot moved in the last update"""
+        if not self.count:
+            return 0.0
+        scratch = self.scratch[0]
+        np.subtract(self.x, self.previous_x, out=scratch)
+        np.abs(scratch, out=scratch)
+        reach = scratch.max()
+        np.subtract(self.y, self.previous_y, out=scratch)
+        np.abs(scratch, out=scratch)
+        return float(max(reach, scratch.max()))
+
+    def sweep_hits(self, x0, y0, x1, y1, radius):
+        """Indices of slots that came within radius of a mover going from (x0, y0) to (x1, y1)
+
+        Both sides are taken to move in a straight line over the tick, so a
+        fast mover can't skip past a slot between two ticks.
+        """
+        # The slots end up at most reach away from where the sweep can touch them
+        candidates = self.grid.query_cells((x0 + x1) / 2, (y0 + y1) / 2,
+                                           max(abs(x1 - x0), abs(y1 - y0)) / 2 + radius + self.reach())
+        if not candidates:
+            return []
+        # Same closest approach as spatial.sweep_distance_sq, for all candidates at once
+        i = np.array(candidates)
+        previous_x = self.previous_x[i]
+        previous_y = self.previous_y[i]
+        wx = previous_x - x0
+        wy = previous_y - y0
+        vx = self.x[i] - previous_x - (x1 - x0)
+        vy = self.y[i] - previous_y - (y1 - y0)
+        speed_sq = vx*vx + vy*vy
+        t = np.divide(-(wx*vx + wy*vy), speed_sq, out=np.zeros(len(i)), where=speed_sq > 0)
+        np.clip(t, 0.0, 1.0, out=t)
+        wx += vx*t
+        wy += vy*t
+        return i[wx*wx + wy*wy < radius * radius].tolist()
+
+    def hits(self, x, y, radius):
+        """Indices of slots within radius of (x, y)"""
+        radius_sq = radius * radius
+        found = []
+        for i in self.grid.query_cells(x, y, radius):
+            dx = x - self.x[i]
+            dy = y - self.y[i]
+            if dx*dx + dy*dy < radius_sq:
+                found.append(i)
+        return found
+
+class EnemyBatch(GridBatch):
+    """Every rival pirate in one pool, patrolling or pursuing in a single batched step
+
+    Enemies roam their territory, turning back at its edges and picking a new
+    heading every ENEMY_TURN_TICKS. With a pursuit range, the ones whose territory
+    is that close to the player steer by the shared flow field instead, still
+    held inside their territory.
+    """
+    # Enemy is always "moving" → run animation
+    animation = ENEMY_RUN_ANIMATION
+
+    def __init__(self, territories, grid, rng, pursuit_range=0):
+        super().__init__(len(territories), grid)
+        bounds = np.array([(territory.left, territory.top, territory.right, territory.bottom,
+                            territory.centerx, territory.centery) for territory in territories],
+                          dtype=float).reshape(-1, 6)
+        (self.left, self.top, self.right, self.bottom,
+         self.center_x, self.center_y) = (column.copy() for column in bounds.T)
+        self.pursuit_range = pursuit_range
+        self.direction = np.zeros(self.count)
+        self.speed = np.full(self.count, float(ENEMY_SPEED))
+        self.turn_timer = np.zeros(self.count, dtype=np.int64)
+        # Ticks each enemy moves this update: 1 near the camera, more or 0 off-screen
+        self.steps = np.ones(self.count, dtype=np.int64)
+        self.pursuing = np.zeros(self.count, dtype=bool)
+        self.restart(rng)
+
+    def restart(self, rng):
+        """Back to the territory centers with new headings from rng"""
+        self.rng = rng
+        self.x[:] = self.center_x
+        self.y[:] = self.center_y
+        self.rng.random(out=self.direction)
+        self.direction *= 2 * math.pi
+        self.turn_timer[:] = 0
+        self.pursuing[:] = False
+        self.index_grid()
+
+    def update(self, field=None):
+        """Move every enemy by its steps, pursuers along field when given"""
+        self.remember_positions()
+        steps = self.steps
+        x, y, direction = self.x, self.y, self.direction
+        move, scratch, _ = self.scratch
+        mask, pursuing = self.mask, self.pursuing
+
+        if field is not None:
+            # The player within pursuit range of the territory, and the enemy awake
+            target_x, target_y = field.target
+            reach = self.pursuit_range
+            np.less_equal(self.left, target_x + reach, out=pursuing)
+            np.greater_equal(self.right, target_x - reach, out=mask)
+            pursuing &= mask
+            np.less_equal(self.top, target_y + reach, out=mask)
+            pursuing &= mask
+            np.greater_equal(self.bottom, target_y - reach, out=mask)
+            pursuing &= mask
+            np.not_equal(steps, 0, out=mask)
+            pursuing &= mask
+            chasing = self.changed(pursuing)
+            if chasing is not None:
+                direction[chasing] = field.sample(x[chasing], y[chasing])
+
+        np.multiply(self.speed, steps, out=move)
+        np.cos(direction, out=scratch)
+        scratch *= move
+        x += scratch
+        np.sin(direction, out=scratch)
+        scratch *= move
+        y += scratch
+
+        # Turn back at the territory edge (pursuers keep their heading) and stay inside
+        np.less(x, self.left, out=mask)
+        np.greater_equal(x, self.right, out=self.mask_other)
+        mask |= self.mask_other
+        np.less(y, self.top, out=self.mask_other)
+        mask |= self.mask_other
+        np.greater_equal(y, self.bottom, out=self.mask_other)
+        mask |= self.mask_other
+        if field is not None:
+            np.logical_not(pursuing, out=self.mask_other)
+            mask &= self.mask_other
+        np.add(direction, math.pi, out=direction, where=mask)
+        np.clip(x, self.left, self.right, out=x)
+        np.clip(y, self.top, self.bottom, out=y)
+
+        self.turn_timer += steps
+        np.greater(self.turn_timer, ENEMY_TURN_TICKS, out=mask)
+        turning = self.changed(mask)
+        if turning is not None:
+            headings = self.scratch[2][:len(turning)]
+            self.rng.random(out=headings)
+            headings *= 2 * math.pi
+            direction[turning] = headings
+            self.turn_timer[turning] = 0
+
+        self.sync_grid()
+
+class Coin:
+    """Class for collectible coins"""
+    __slots__ = ('x', 'y', 'collected')
+    animation = COIN_ANIMATION
+
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+        self.collected = False
+
+class PowerUp:
+    """Class for speed powerups"""
+    __slots__ = ('x', 'y', 'collected')
+    animation = POWERUP_ANIMATION
+
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+        self.collected = False
+
+class ProjectileBatch(GridBatch):
+    """Fixed-capacity struct-of-arrays pool for every projectile, moved in one batched step
+
+    Leaving the screen respawns a slot in place, without allocating per tick.
+    """
+    def __init__(self, count, grid, rng, width=WIDTH, height=HEIGHT):
+        super().__init__(count, grid)
+        self.width = width
+        self.height = height
+        self.rng = rng
+        self.direction = np.zeros(count)
+        self.speed = np.zeros(count)
+        # Per-tick velocity, so moving needs no cos/sin
+        self.vx = np.zeros(count)
+        self.vy = np.zeros(count)
+        self.animation = PROJECTILE_ANIMATION
+        self.reset(self.slots)
+        self.index_grid()
+
+    def restart(self, rng):
+        """Start a new round on the same arrays with a new random stream"""
+        self.rng = rng
+        self.reset(self.slots)
+        self.index_grid()
+
+    def reset(self, indices):
+        """Respawn the given projectiles on random borders, all at once"""
+        k = len(indices)
+        side, along, value = (scratch[:k] for scratch in self.scratch)
+        on_side = self.mask_other[:k]
+        # Choose random border for spawn: top, right, bottom or left
+        self.rng.random(out=side)
+        side *= 4
+        np.floor(side, out=side)
+        self.rng.random(out=along)
+
+        # x: along the top/bottom edge, or just past the left/right one
+        np.multiply(along, self.width + 1, out=value)
+        np.floor(value, out=value)
+        np.equal(side, 1, out=on_side)
+        value[on_side] = self.width + 20
+        np.equal(side, 3, out=on_side)
+        value[on_side] = -20
+        self.x[indices] = value
+        np.multiply(along, self.height + 1, out=value)
+        np.floor(value, out=value)
+        np.equal(side, 0, out=on_side)
+        value[on_side] = -20
+        np.equal(side, 2, out=on_side)
+        value[on_side] = self.height + 20
+        self.y[indices] = value
+
+        # Random direction and speed
+        direction, speed = side, along
+        self.rng.random(out=direction)
+        direction *= 2 * math.pi
+        self.rng.random(out=speed)
+        speed *= 2
+        speed += 2
+        self.direction[indices] = direction
+        self.speed[indices] = speed
+        np.cos(direction, out=value)
+        value *= speed
+        self.vx[indices] = value
+        np.sin(direction, out=value)
+        value *= speed
+        self.vy[indices] = value
+        # A respawn is a jump, not a path to sweep
+        self.previous_x[indices] = self.x[indices]
+        self.previous_y[indices] = self.y[indices]
+
+    def respawn(self, indices):
+        """Reset projectiles outside of update, keeping the grid in sync"""
+        self.reset(indices)
+        self.sync_grid()
+
+    def update(self):
+        self.remember_positions()
+        self.x += self.vx
+        self.y += self.vy
+
+        # Respawn every projectile that left the screen
+        mask, other = self.mask, self.mask_other
+        np.less(self.x, -30, out=mask)
+        np.greater(self.x, self.width + 30, out=other)
+        mask |= other
+        np.less(self.y, -30, out=other)
+        mask |= other
+        np.greater(self.y, self.height + 30, out=other)
+        mask |= other
+        gone = self.changed(mask)
+        if gone is not None:
+            self.reset(gone)
+
+        self.sync_grid()
+
+class ParticleBatch:
+    """Fixed-capacity ring of particles stored as arrays
+
+    Every particle lives exactly LIFE ticks, so they expire in the order
+    they were emitted: the slots behind the live run are the free list.
+    Emitting and expiring only move the ring's ends, nothing is allocated.
+    When the ring is full the oldest particles are overwritten.
+    """
+    LIFE = 30
+
+    def __init__(self, capacity=MAX_PARTICLES):
+        self.capacity = capacity
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.vx = np.zeros(capacity)
+        self.vy = np.zeros(capacity)
+        self.expires = np.zeros(capacity, dtype=np.int64)
+        self.color = np.zeros((capacity, 3), dtype=np.uint8)
+        self.head = 0  # Next slot to emit into
+        self.count = 0
+        self.now = 0
+        self.rng = np.random.default_rng()
+
+    def __len__(self):
+        return self.count
+
+    def segments(self):
+        """(start, end) slot ranges holding the live particles, oldest first"""
+        tail = (self.head - self.count) % self.capacity
+        if tail + self.count <= self.capacity:
+            return ((tail, tail + self.count),)
+        return ((tail, self.capacity), (0, self.head))
+
+    def clear(self, rng=None):
+        self.head = self.count = self.now = 0
+        if rng is not None:
+            self.rng = rng
+
+    def emit(self, x, y, color, count):
+        """Emit count particles from (x, y), or from per-particle arrays x and y"""
+        if np.ndim(x):
+            # Only the newest ones would survive a ring overflow
+            x = x[-self.capacity:]
+            y = y[-self.capacity:]
+        count = min(count, self.capacity)
+        start = self.head
+        done = 0
+        while count:
+            end = min(start + count, self.capacity)
+            if np.ndim(x):
+                self.x[start:end] = x[done:done + end - start]
+                self.y[start:end] = y[done:done + end - start]
+            else:
+                self.x[start:end] = x
+                self.y[start:end] = y
+            for velocity in (self.vx[start:end], self.vy[start:end]):
+                # Uniform in [-3, 3), drawn straight into the pool
+                self.rng.random(out=velocity)
+                velocity *= 6
+                velocity -= 3
+            self.expires[start:end] = self.now + self.LIFE
+            self.color[start:end] = color
+            self.count = min(self.count + end - start, self.capacity)
+            count -= end - start
+            done += end - start
+            start = end % self.capacity
+        self.head = start
+
+    def emit_bursts(self, xs, ys, color, per_burst):
+        """One burst of per_burst particles at each origin, written in a single emit"""
+        self.emit(np.repeat(np.asarray(xs, dtype=float), per_burst),
+                  np.repeat(np.asarray(ys, dtype=float), per_burst), color, len(xs) * per_burst)
+
+    def update(self):
+        self.now += 1
+        for start, end in self.segments():
+            self.x[start:end] += self.vx[start:end]
+            self.y[start:end] += self.vy[start:end]
+        # Expiry times are sorted oldest first, so the dead are a run at the tail
+        for start, end in self.segments():
+            dead = int(np.searchsorted(self.expires[start:end], self.now, side='right'))
+            self.count -= dead
+            if dead < end - start:
+                break
+
+class NullAudio:
+    """Audio adapter that ignores every request, used by headless runs"""
+    def play_sound(self, name):
+        pass
+
+    def play_music(self, name):
+        pass
+
+    def stop_music(self):
+        pass
+
+class Game:
+    """Main game class"""
+    def __init__(self, audio=None, seed=None, profiler=None, level=DEFAULT_LEVEL,
+                 enemy_count=None, coin_count=None, powerup_count=None, projectile_count=None,
+                 particle_capacity=MAX_PARTICLES, world_width=None, world_height=None,
+                 collision_mode='discrete'):
+        if collision_mode not in COLLISION_MODES:
+            raise ValueError(f"Unknown collision mode {collision_mode!r}, expected one of {COLLISION_MODES}")
+        self.audio = audio or NullAudio()
+        # Swept collisions catch fast movers that would skip past a target between two ticks
+        self.collision_mode = collision_mode
+        self.level_name = level
+        # Overrides of the level's counts and world size, None keeps the level's own
+        self.overrides = (enemy_count, coin_count, powerup_count, projectile_count,
+                          world_width, world_height)
+        # Level and overrides the current entities were built for
+        self.layout_key = None
+        self.world_width = WIDTH
+        self.world_height = HEIGHT
+        self.camera = None
+        self.enemy_count = self.coin_count = self.powerup_count = self.projectile_count = 0
+        self.profiler = profiler or NullProfiler()
+        # Every round draws its own seed from this stream
+        self.seed_rng = random.Random(seed)
+        self.round_seed = None
+        self.tick = 0
+        self.replay = None
+        self.finished_replay = None
+        self.state = "menu"
+        self.score = 0
+        self.music_on = True
+        self.sfx_on = True
+        self.quit_requested = False
+        # Front ends that load assets in the background hold the countdown on this
+        self.assets_ready = True
+        self.countdown_active = False
+        self.countdown_timer = 0
+        self.countdown_number = 3
+        self.fade_alpha = 0
+        self.buttons = {
+            "start": Rect(250, 220, 300, 70),
+            "music": Rect(250, 310, 300, 60),
+            "sfx": Rect(250, 390, 300, 60),
+            "exit": Rect(250, 470, 300, 60)
+        }
+        self.button_hover = None
+        self.player = None
+        self.enemies = None
+        self.flow_field = FlowField()
+        self.pathfinder = None
+        # Click-to-move query still searching, answered on a later tick
+        self.path_request = None
+        self.coins = []
+        self.powerups = []
+        self.projectiles = None
+        self.particles = ParticleBatch(particle_capacity)
+        # Broad-phase grids, one per kind of entity the player can touch
+        self.coin_grid = SpatialGrid()
+        self.powerup_grid = SpatialGrid()
+        self.enemy_grid = SpatialGrid()
+        self.projectile_grid = SpatialGrid()
+        self.coins_collected = 0
+        self.events = EventBus()
+        self.events.subscribe(CoinCollected, self.on_coins_collected)
+        self.events.subscribe(PowerUpCollected, self.on_powerups_collected)
+        self.events.subscribe(PlayerHit, self.on_player_hit)
+        self.events.subscribe(Victory, self.on_victory)
+        # Bumped whenever the static layout changes, renderers re-bake on it
+        self.territories = []
+        self.level_version = 0
+        self.init_game()
+
+    def init_game(self, seed=None):
+        if seed is None:
+            seed = self.seed_rng.getrandbits(32)
+        self.round_seed = seed
+        self.tick = 0
+        self.path_request = None
+        self.replay = Replay(seed, self.level_name, collision_mode=self.collision_mode)
+        level = load_level(self.level_name)
+        layout_key = (level, self.overrides)
+        if layout_key != self.layout_key:
+            self.build_level(level)
+            self.layout_key = layout_key
+        else:
+            self.reset_level(level)
+        self.particles.clear(np.random.default_rng([seed, PARTICLE_STREAM]))
+        self.score = 0
+        self.coins_collected = 0
+        self.build_grids()
+        self.camera.follow(self.player.x, self.player.y)
+
+        # Start background music
+        if self.music_on:
+            self.audio.play_music('soundtrack')
+
+    def set_level(self, name):
+        """Switch level, taking effect when the next round starts"""
+        self.level_name = name
+
+    def build_level(self, level):
+        """Instantiate every entity of a level with the overridden counts"""
+        enemy_count, coin_count, powerup_count, projectile_count, world_width, world_height = (
+            default if override is None else override
+            for override, default in zip(self.overrides, (
+                len(level.territories), len(level.coins), len(level.powerups),
+                level.projectile_count, level.world_width, level.world_height)))
+        self.enemy_count = enemy_count
+        self.coin_count = coin_count
+        self.powerup_count = powerup_count
+        self.projectile_count = projectile_count
+        # The world is never smaller than the screen
+        self.world_width = max(world_width, WIDTH)
+        self.world_height = max(world_height, HEIGHT)
+        self.camera = Camera(WIDTH, HEIGHT, self.world_width, self.world_height)
+        self.player = Player(level.player_x, level.player_y)
+        # Scaled-up counts get extra positions, the same ones every round
+        layout_rng = random.Random(LAYOUT_SEED)
+        territories = [Rect(*territory) for territory in level.territories[:enemy_count].tolist()]
+        while len(territories) < enemy_count:
+            territories.append(Rect(layout_rng.randint(0, self.world_width - 120),
+                                    layout_rng.randint(30, self.world_height - 80), 120, 80))
+        self.territories = territories
+        self.level_version += 1
+        # The player routes around enemy territories
+        self.pathfinder = Pathfinder(NavGrid(self.world_width, self.world_height, territories))
+        # Enemies start at the center of their territories
+        self.enemies = EnemyBatch(territories, self.enemy_grid,
+                                  np.random.default_rng([self.round_seed, ENEMY_STREAM]),
+                                  level.pursuit_range)
+        coin_positions = level.coins[:coin_count].tolist()
+        while len(coin_positions) < coin_count:
+            coin_positions.append((layout_rng.randint(10, self.world_width - 10),
+                                   layout_rng.randint(10, self.world_height - 10)))
+        self.coins = [Coin(x, y) for x, y in coin_positions]
+        powerup_positions = level.powerups[:powerup_count].tolist()
+        while len(powerup_positions) < powerup_count:
+            powerup_positions.append((layout_rng.randint(10, self.world_width - 10),
+                                      layout_rng.randint(10, self.world_height - 10)))
+        self.powerups = [PowerUp(x, y) for x, y in powerup_positions]
+        self.projectiles = ProjectileBatch(projectile_count, self.projectile_grid,
+                                           np.random.default_rng(self.round_seed),
+                                           self.world_width, self.world_height)
+
+    def reset_level(self, level):
+        """Restart the current level on the existing objects instead of rebuilding them"""
+        self.player.reset(level.player_x, level.player_y)
+        self.enemies.restart(np.random.default_rng([self.round_seed, ENEMY_STREAM]))
+        for coin in self.coins:
+            coin.collected = False
+        for powerup in self.powerups:
+            powerup.collected = False
+        self.projectiles.restart(np.random.default_rng(self.round_seed))
+
+    def build_grids(self):
+        """Index every live pickup in its collision grid (batches index themselves)"""
+        grids = [
+            (self.coin_grid, [coin for coin in self.coins if not coin.collected]),
+            (self.powerup_grid, [powerup for powerup in self.powerups if not powerup.collected])
+        ]
+        for grid, entities in grids:
+            grid.clear()
+            for entity in entities:
+                grid.insert(entity)
+
+    def update_enemies(self):
+        """Enemies near the camera move every tick, the rest in staggered bigger steps"""
+        enemies = self.enemies
+        steps = enemies.steps
+        if self.camera.covers_world:
+            steps[:] = 1
+        else:
+            # A different slice of the far enemies catches up each tick
+            interval = OFFSCREEN_ENEMY_INTERVAL
+            steps[:] = 0
+            steps[self.tick % interval::interval] = interval
+            steps[enemies.visible(self.camera.viewport(ACTIVE_MARGIN))] = 1
+        field = None
+        if enemies.pursuit_range:
+            field = self.flow_field
+            field.update(self.player.x, self.player.y)
+        enemies.update(field)
+
+    def start_round(self, seed=None):
+        """Skip the menu and countdown and begin a fresh round"""
+        self.countdown_active = False
+        self.state = "playing"
+        self.init_game(seed)
+
+    def state_hash(self):
+        """Digest of the simulation state, compared when verifying replays"""
+        digest = hashlib.blake2b(digest_size=8)
+        player = self.player
+        digest.update(repr((
+            self.tick, self.state, self.score, player.lives,
+            [coin.collected for coin in self.coins],
+            [powerup.collected for powerup in self.powerups]
+        )).encode())
+        # Packed as doubles: the player position is an int or a float depending on how it got there
+        digest.update(struct.pack('<2d', player.x, player.y))
+        for array in (self.enemies.x, self.enemies.y, self.enemies.direction):
+            digest.update(array.tobytes())
+        digest.update(self.projectiles.x.tobytes())
+        digest.update(self.projectiles.y.tobytes())
+        return digest.digest()
+
+    def snapshot(self):
+        """Everything a client needs to draw the current tick, as plain picklable values"""
+        player = self.player
+        return {
+            'tick': self.tick,
+            'state': self.state,
+            'countdown': self.countdown_number if self.countdown_active else None,
+            'level': self.level_name,
+            'score': self.score,
+            'coins_collected': self.coins_collected,
+            'player': (player.x, player.y, player.direction, player.lives,
+                       player.invincible, player.powerup_active),
+            'enemies': list(zip(self.enemies.x.tolist(), self.enemies.y.tolist())),
+            'coins': [coin.collected for coin in self.coins],
+            'powerups': [powerup.collected for powerup in self.powerups],
+            'projectiles': (self.projectiles.x.tolist(), self.projectiles.y.tolist())
+        }
+
+    def take_finished_replay(self):
+        """Replay of the last round that ended, handed out once"""
+        replay = self.finished_replay
+        self.finished_replay = None
+        return replay
+
+    def sprite_frames(self):
+        """All animation frames used by the player and enemy sprites"""
+        animations = [PLAYER_IDLE_ANIMATION, PLAYER_RUN_ANIMATION, ENEMY_RUN_ANIMATION]
+        return [frame for animation in animations for frame in animation.frames]
+
+    def add_particles(self, x, y, color, count=5):
+        """Add particle effects"""
+        self.particles.emit(x, y, color, count)
+
+    def on_coins_collected(self, events):
+        self.coins_collected += len(events)
+        self.score += 10 * len(events)
+        self.particles.emit_bursts([event.x for event in events], [event.y for event in events],
+                                   (255, 215, 0), 8)
+        # One sound however many coins were picked up this tick
+        if self.sfx_on:
+            self.audio.play_sound('coin')
+
+    def on_powerups_collected(self, events):
+        self.score += 20 * len(events)
+        self.player.activate_powerup()
+        self.particles.emit_bursts([event.x for event in events], [event.y for event in events],
+                                   (100, 150, 255), 12)
+
+    def on_player_hit(self, events):
+        for source, color, count in (('enemy', (255, 100, 100), 10),
+                                     ('projectile', (255, 150, 50), 8)):
+            hits = [event for event in events if event.source == source]
+            if hits:
+                self.particles.emit_bursts([event.x for event in hits],
+                                           [event.y for event in hits], color, count)
+        if self.player.lives <= 0:
+            self.state = "game_over"
+
+    def on_victory(self, events):
+        self.state = "game_over"
+
+    def start_countdown(self):
+        """Start countdown for the game"""
+        self.countdown_active = True
+        self.countdown_timer = 0
+        self.countdown_number = 3
+        self.fade_alpha = 0
+
+    def run(self, ticks):
+        """Step the simulation as fast as possible, returns ticks executed"""
+        for tick in range(ticks):
+            if self.state != "playing" and not self.countdown_active:
+                return tick
+            self.update()
+        return ticks
+
+    def update(self):
+        with self.profiler.section('update'):
+            self.step()
+
+    def step(self):
+        """Advance one tick of countdown or gameplay"""
+        if self.countdown_active:
+            self.countdown_timer += 1
+            if self.countdown_timer < 10:  # Fade in instantaneo
+                self.fade_alpha = 255
+            elif self.countdown_timer >= 30 and self.countdown_timer < 60:  # Mostrar numero
+                pass
+            elif self.countdown_timer >= 60:  # Proximo numero mais rapido
+                self.countdown_number -= 1
+                self.countdown_timer = 30
+                if self.countdown_number < 0:  # GO!
+                    if self.assets_ready:
+                        self.start_round()
+                    else:
+                        # Keep showing "GO!" until the front end has its assets
+                        self.countdown_number = 0
+            return
+
+        if self.state == "playing":
+            profiler = self.profiler
+            with profiler.section('update.entities'):
+                request = self.path_request
+                if request is not None:
+                    self.pathfinder.step(request)
+                    if request.ready:
+                        self.player.follow(request.waypoints)
+                        self.path_request = None
+                self.player.update()
+                self.camera.follow(self.player.x, self.player.y)
+                self.update_enemies()
+                self.projectiles.update()
+
+            # Atualizar particulas
+            with profiler.section('update.particles'):
+                self.particles.update()
+
+            # Check collisions, only against entities in nearby grid cells.
+            # Detection only marks what was hit; score, effects and state changes
+            # run after it, once per tick, as event handlers
+            player = self.player
+            start_x, start_y = player.previous_x, player.previous_y
+            events = self.events
+            tick = self.tick
+            swept = self.collision_mode == 'swept'
+            with profiler.section('collide.coins'):
+                if swept:
+                    coins = self.coin_grid.query_sweep(start_x, start_y, player.x, player.y, 25)
+                else:
+                    coins = self.coin_grid.query(player.x, player.y, 25)
+                for coin in coins:
+                    coin.collected = True
+                    self.coin_grid.remove(coin)
+                    events.emit(CoinCollected(tick, coin.x, coin.y))
+
+            # Check powerup collision
+            with profiler.section('collide.powerups'):
+                if swept:
+                    powerups = self.powerup_grid.query_sweep(start_x, start_y, player.x, player.y, 30)
+                else:
+                    powerups = self.powerup_grid.query(player.x, player.y, 30)
+                for powerup in powerups:
+                    powerup.collected = True
+                    self.powerup_grid.remove(powerup)
+                    events.emit(PowerUpCollected(tick, powerup.x, powerup.y))
+
+            # Check enemy collision
+            with profiler.section('collide.enemies'):
+                if swept:
+                    hits = self.enemies.sweep_hits(start_x, start_y, player.x, player.y, 30)
+                else:
+                    hits = self.enemies.hits(player.x, player.y, 30)
+                for _ in hits:
+                    if player.take_damage():
+                        events.emit(PlayerHit(tick, player.x, player.y, 'enemy', player.lives))
+
+            # Check projectile collision
+            with profiler.section('collide.projectiles'):
+                if swept:
+                    hits = self.projectiles.sweep_hits(start_x, start_y, player.x, player.y, 20)
+                else:
+                    hits = self.projectiles.hits(player.x, player.y, 20)
+                for index in hits:
+                    if player.take_damage():
+                        self.projectiles.respawn([index])  # Reset projectile
+                        events.emit(PlayerHit(tick, player.x, player.y, 'projectile', player.lives))
+
+            with profiler.section('events'):
+                events.dispatch()
+                # Check victory
+                if self.coins_collected == len(self.coins) and self.state == "playing":
+                    events.emit(Victory(tick, self.score))
+                    events.dispatch()
+
+            self.tick += 1
+            if self.state != "playing":
+                self.replay.finish(self.tick, self.state_hash())
+                self.finished_replay = self.replay
+
+    def handle_click(self, pos):
+        if self.countdown_active:
+            return
+
+        if self.state == "menu":
+            # Verificar hover dos botoes
+            self.button_hover = None
+            for key, button in self.buttons.items():
+                if button.collidepoint(pos):
+                    self.button_hover = key
+                    break
+
+            if self.buttons["start"].collidepoint(pos):
+                self.start_countdown()
+            elif self.buttons["music"].collidepoint(pos):
+                self.music_on = not self.music_on
+                if self.music_on:
+                    self.audio.play_music('soundtrack')
+                else:
+                    self.audio.stop_music()
+            elif self.buttons["sfx"].collidepoint(pos):
+                self.sfx_on = not self.sfx_on
+            elif self.buttons["exit"].collidepoint(pos):
+                self.quit_requested = True
+        elif self.state == "playing":
+            self.move_player(*self.camera.to_world(pos[0], pos[1]))
+        elif self.state == "game_over":
+            self.state = "menu"
+
+    def move_player(self, x, y):
+        """Click-to-move input, recorded with its tick for replays"""
+        # Replays store whole pixels, so the live game must steer by the same target
+        x = int(max(0, min(self.world_width, x)))
+        y = int(max(0, min(self.world_height, y)))
+        self.replay.record(self.tick, x, y)
+        player = self.player
+        request = self.pathfinder.request(player.x, player.y, x, y)
+        if request.ready:
+            player.follow(request.waypoints)
+            self.path_request = None
+        else:
+            # Keep walking the current path until the new one is found
+            self.path_request = request
+
+    def handle_mouse_move(self, pos):
+        """Update button hover state"""
+        if self.state == "menu":
+            self.button_hover = None
+            for key, button in self.buttons.items():
+                if button.collidepoint(pos):
+                    self.button_hover = key
+                    break
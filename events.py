@@ -0,0 +1,53 @@
+"""
+Treasure Hunt - Pirate Adventure
+Author: Matheus Abrahao
+Gameplay events: collision checks queue them, handlers apply them once per tick
+"""
+
+from collections import namedtuple
+
+# Plain tuples, so they pickle for the server and compare in tests of a replay
+CoinCollected = namedtuple('CoinCollected', 'tick x y')
+PowerUpCollected = namedtuple('PowerUpCollected', 'tick x y')
+PlayerHit = namedtuple('PlayerHit', 'tick x y source lives')  # source: 'enemy' or 'projectile'
+Victory = namedtuple('Victory', 'tick score')
+
+class EventBus:
+    """Queue of this tick's events, handed to handlers grouped by type
+
+    Each handler gets every event of its type from the tick in one list, so a
+    burst of pickups costs one particle write and one sound. Events emitted
+    while dispatching are handled in the same dispatch.
+    """
+    def __init__(self):
+        self.queue = []
+        self.handlers = {}
+        # Called with every event, in emission order (telemetry, networking)
+        self.listeners = []
+
+    def subscribe(self, event_type, handler):
+        """Call handler(events) with the batch of event_type events of each tick"""
+        self.handlers.setdefault(event_type, []).append(handler)
+
+    def listen(self, listener):
+        """Call listener(events) with all events of each tick, in the order emitted"""
+        self.listeners.append(listener)
+
+    def emit(self, event):
+        self.queue.append(event)
+
+    def clear(self):
+        self.queue = []
+
+    def dispatch(self):
+        while self.queue:
+            events, self.queue = self.queue, []
+            for listener in self.listeners:
+                listener(events)
+            # Types in the order their first event was emitted
+            batches = {}
+            for event in events:
+                batches.setdefault(type(event), []).append(event)
+            for event_type, batch in batches.items():
+                for handler in self.handlers.get(event_type, ()):
+                    handler(batch)
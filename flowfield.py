@@ -0,0 +1,47 @@
+"""
+Treasure Hunt - Pirate Adventure
+Author: Matheus Abrahao
+Flow field steering every pursuing enemy toward the player
+"""
+
+import numpy as np
+
+FLOW_CELL = 32
+FLOW_RADIUS = 16  # Cells on each side of the target, pursuers further out use the edge
+
+class FlowField:
+    """Heading toward a target for each cell of a window around it, shared by all pursuers
+
+    Built at most once per tick, then sampled by every pursuer with one gather.
+    """
+    def __init__(self, cell_size=FLOW_CELL, radius=FLOW_RADIUS):
+        self.cell_size = cell_size
+        self.radius = radius
+        side = 2 * radius + 1
+        self.heading = np.zeros((side, side))
+        # Cell centers relative to the window's first cell
+        self.offsets = (np.arange(side) + 0.5) * cell_size
+        self.scratch = [np.zeros(side) for _ in range(2)]
+        self.origin_x = self.origin_y = 0
+        self.target = None
+
+    def update(self, x, y):
+        """Point every cell at (x, y), skipped while the target stays put"""
+        if self.target == (x, y):
+            return
+        self.target = (x, y)
+        size = self.cell_size
+        self.origin_x = int(x // size) - self.radius
+        self.origin_y = int(y // size) - self.radius
+        dx, dy = self.scratch
+        np.subtract(x - self.origin_x * size, self.offsets, out=dx)
+        np.subtract(y - self.origin_y * size, self.offsets, out=dy)
+        np.arctan2(dy[:, None], dx[None, :], out=self.heading)
+
+    def sample(self, x, y):
+        """Headings at the given positions, from the nearest cell inside the window"""
+        last = 2 * self.radius
+        size = self.cell_size
+        column = np.clip(x // size - self.origin_x, 0, last).astype(np.intp)
+        row = np.clip(y // size - self.origin_y, 0, last).astype(np.intp)
+        return self.heading[row, column]
@@ -0,0 +1,108 @@
+"""
+Treasure Hunt - Pirate Adventure
+Author: Matheus Abrahao
+Levels: authored as JSON in levels/, compiled to a compact binary form
+
+Recompile after editing a level (stale or missing .lvl files fall back to JSON):
+    python level.py
+"""
+
+import glob
+import json
+import os
+import struct
+
+import numpy as np
+
+LEVELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'levels')
+DEFAULT_LEVEL = 'port'
+MAGIC = b'TRLV'
+VERSION = 2
+# Magic, version, world size, player start, projectiles, pursuit range,
+# territory/coin/powerup counts
+HEADER = struct.Struct('<4sBHHHHHHIII')
+
+# Compiled levels by name, so switching back to one costs a dict lookup
+LEVEL_CACHE = {}
+
+class Level:
+    """World size, player start and int32 position arrays of one level"""
+    __slots__ = ('name', 'world_width', 'world_height', 'player_x', 'player_y',
+                 'projectile_count', 'pursuit_range', 'territories', 'coins', 'powerups')
+
+    def __init__(self, name, world, player, projectile_count, territories, coins, powerups,
+                 pursuit_range=0):
+        self.name = name
+        self.world_width, self.world_height = world
+        self.player_x, self.player_y = player
+        self.projectile_count = projectile_count
+        # Enemies chase a player this close to their territory, 0 keeps them patrolling
+        self.pursuit_range = pursuit_range
+        # (n, 4) left, top, width, height and (n, 2) x, y
+        self.territories = np.asarray(territories, dtype=np.int32).reshape(-1, 4)
+        self.coins = np.asarray(coins, dtype=np.int32).reshape(-1, 2)
+        self.powerups = np.asarray(powerups, dtype=np.int32).reshape(-1, 2)
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(data['name'], data['world'], data['player'], data['projectiles'],
+                   data['territories'], data['coins'], data['powerups'],
+                   data.get('pursuit_range', 0))
+
+    def to_bytes(self):
+        header = HEADER.pack(MAGIC, VERSION, self.world_width, self.world_height,
+                             self.player_x, self.player_y, self.projectile_count,
+                             self.pursuit_range, len(self.territories), len(self.coins), len(self.powerups))
+        return header + b''.join(array.astype('<i4').tobytes()
+                                 for array in (self.territories, self.coins, self.powerups))
+
+    @classmethod
+    def from_bytes(cls, name, data):
+        (magic, version, world_width, world_height, player_x, player_y, projectiles, pursuit_range,
+         territory_count, coin_count, powerup_count) = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a compiled Treasure Hunt level (or an unsupported version)")
+        # Views straight over the file contents, no per-value parsing
+        offset = HEADER.size
+        arrays = []
+        for count, width in ((territory_count, 4), (coin_count, 2), (powerup_count, 2)):
+            arrays.append(np.frombuffer(data, '<i4', count * width, offset).reshape(count, width))
+            offset += count * width * 4
+        return cls(name, (world_width, world_height), (player_x, player_y), projectiles, *arrays,
+                   pursuit_range)
+
+def level_paths(name, levels_dir=LEVELS_DIR):
+    return os.path.join(levels_dir, name + '.json'), os.path.join(levels_dir, name + '.lvl')
+
+def compile_level(name, levels_dir=LEVELS_DIR):
+    """Write <name>.lvl next to <name>.json, returns the compiled level"""
+    source, compiled = level_paths(name, levels_dir)
+    with open(source) as f:
+        level = Level.from_json(json.load(f))
+    with open(compiled, 'wb') as f:
+        f.write(level.to_bytes())
+    return level
+
+def load_level(name=DEFAULT_LEVEL, levels_dir=LEVELS_DIR):
+    """Compiled level, read once and then served from the cache"""
+    level = LEVEL_CACHE.get(name)
+    if level is not None:
+        return level
+    source, compiled = level_paths(name, levels_dir)
+    if os.path.exists(compiled) and (not os.path.exists(source) or
+                                     os.path.getmtime(compiled) >= os.path.getmtime(source)):
+        with open(compiled, 'rb') as f:
+            level = Level.from_bytes(name, f.read())
+    else:
+        with open(source) as f:
+            level = Level.from_json(json.load(f))
+    LEVEL_CACHE[name] = level
+    return level
+
+if __name__ == '__main__':
+    for path in sorted(glob.glob(os.path.join(LEVELS_DIR, '*.json'))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        level = compile_level(name)
+        print(f"{name}: {level.world_width}x{level.world_height}, {len(level.territories)} territories, "
+              f"{len(level.coins)} coins, {len(level.powerups)} powerups"
+              + (f", pursuit range {level.pursuit_range}" if level.pursuit_range else ""))
@@ -0,0 +1,505 @@
+"""
+Treasure Hunt - Pirate Adventure
+Author: Matheus Abrahao
+Click-to-move pathfinding: jump point search on a navigation grid of the level
+
+Query timings on a generated map:
+    python pathfinding.py --world 20000x15000 --territories 10000
+"""
+
+import argparse
+import heapq
+import math
+import random
+import sys
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+NAV_CELL = 32
+NAV_MARGIN = 16  # Territories are blocked this far past their edges
+# Search work per tick, counted in expansions, jump steps (a diagonal step or a straight
+# scan) and queued nodes so it is the same on every machine; longer searches finish later
+PATH_BUDGET = 250
+PATH_MAX_WORK = 200000  # Safety net, past this the goal counts as unreachable
+PATH_CACHE_SIZE = 256
+SQRT2 = math.sqrt(2)
+
+def octile(dx, dy):
+    dx = abs(dx)
+    dy = abs(dy)
+    return max(dx, dy) + (SQRT2 - 1) * min(dx, dy)
+
+class NavGrid:
+    """Walkable cells of a level, padded with a blocked border
+
+    Rows and columns are kept as bytes, next to marks of the cells where a
+    straight jump finds a forced neighbour, so each straight scan of jump point
+    search is a single bytes.find.
+    """
+    def __init__(self, world_width, world_height, blocked, cell_size=NAV_CELL, margin=NAV_MARGIN):
+        self.cell_size = cell_size
+        self.columns = -(-world_width // cell_size)
+        self.rows = -(-world_height // cell_size)
+        walk = np.zeros((self.rows + 2, self.columns + 2), dtype=bool)
+        walk[1:-1, 1:-1] = True
+        for rect in blocked:
+            left = max(0, (rect.left - margin) // cell_size)
+            top = max(0, (rect.top - margin) // cell_size)
+            right = min(self.columns, -(-(rect.right + margin) // cell_size))
+            bottom = min(self.rows, -(-(rect.bottom + margin) // cell_size))
+            walk[top + 1:bottom + 1, left + 1:right + 1] = False
+        self.walk = walk
+        self.regions = self.label_regions()
+
+        # Forced neighbours of straight jumps: an obstacle beside the path just ended
+        up, down = walk[:-2, 1:-1], walk[2:, 1:-1]
+        left, right = walk[1:-1, :-2], walk[1:-1, 2:]
+        up_left, up_right = walk[:-2, :-2], walk[:-2, 2:]
+        down_left, down_right = walk[2:, :-2], walk[2:, 2:]
+        forced = {}
+        for name, marks in (('right', (up & ~up_left) | (down & ~down_left)),
+                            ('left', (up & ~up_right) | (down & ~down_right)),
+                            ('down', (left & ~up_left) | (right & ~up_right)),
+                            ('up', (left & ~down_left) | (right & ~down_right))):
+            padded = np.zeros_like(walk)
+            padded[1:-1, 1:-1] = marks
+            forced[name] = padded
+        as_bytes = lambda array: [line.tobytes() for line in array.view(np.uint8)]
+        self.row_walk = as_bytes(walk)
+        self.column_walk = as_bytes(walk.T.copy())
+        self.forced_right = as_bytes(forced['right'])
+        self.forced_left = as_bytes(forced['left'])
+        self.forced_down = as_bytes(forced['down'].T.copy())
+        self.forced_up = as_bytes(forced['up'].T.copy())
+
+    def label_regions(self):
+        """Number every connected walkable area, 0 marks blocked cells
+
+        Runs of walkable cells in a row are joined with the runs they touch in
+        the row above, union-find style.
+        """
+        walk = self.walk
+        parent = []
+
+        def root(run):
+            while parent[run] != run:
+                parent[run] = parent[parent[run]]
+                run = parent[run]
+            return run
+
+        rows = []
+        previous = []
+        for y in range(1, self.rows + 1):
+            edges = np.flatnonzero(np.diff(walk[y].view(np.int8)))
+            runs = []
+            j = 0
+            for start, end in zip(edges[0::2].tolist(), edges[1::2].tolist()):
+                run = len(parent)
+                parent.append(run)
+                # Runs above that overlap [start + 1, end + 1)
+                while j < len(previous) and previous[j][1] <= start:
+                    j += 1
+                k = j
+                while k < len(previous) and previous[k][0] < end:
+                    other = root(previous[k][2])
+                    if other != run:
+                        parent[other] = run
+                    k += 1
+                runs.append((start, end, run))
+            rows.append(runs)
+            previous = runs
+        labels = np.zeros(walk.shape, dtype=np.int32)
+        for y, runs in enumerate(rows, 1):
+            for start, end, run in runs:
+                labels[y, start + 1:end + 1] = root(run) + 1
+        return labels
+
+    def cell_of(self, x, y):
+        """Padded cell holding a world position, clamped inside the grid"""
+        size = self.cell_size
+        return (min(max(int(x // size), 0), self.columns - 1) + 1,
+                min(max(int(y // size), 0), self.rows - 1) + 1)
+
+    def center(self, cell):
+        size = self.cell_size
+        return ((cell[0] - 0.5) * size, (cell[1] - 0.5) * size)
+
+    def walkable(self, cell):
+        return self.row_walk[cell[1]][cell[0]] == 1
+
+    def nearest_walkable(self, cell, region=None):
+        """The walkable cell closest to cell, within one region if given, or None"""
+        x, y = cell
+        radius = 4
+        while True:
+            top, left = max(y - radius, 1), max(x - radius, 1)
+            bottom, right = min(y + radius, self.rows), min(x + radius, self.columns)
+            if region is None:
+                window = self.walk[top:bottom + 1, left:right + 1]
+            else:
+                window = self.regions[top:bottom + 1, left:right + 1] == region
+            whole = top == 1 and left == 1 and bottom == self.rows and right == self.columns
+            rows, columns = np.nonzero(window)
+            if len(rows):
+                # Squared cell distances, only exact within the window's inner circle
+                distance = (rows + top - y) ** 2 + (columns + left - x) ** 2
+                best = int(np.argmin(distance))
+                if distance[best] <= radius * radius or whole:
+                    return (int(columns[best]) + left, int(rows[best]) + top)
+            elif whole:
+                return None
+            radius *= 2
+
+    def line_of_sight(self, x0, y0, x1, y1):
+        """Whether the straight segment between two world positions stays on walkable cells"""
+        size = self.cell_size
+        # Clamped ends keep every sample between them inside the grid
+        right = self.columns * size - 1
+        bottom = self.rows * size - 1
+        x0 = min(max(x0, 0), right)
+        x1 = min(max(x1, 0), right)
+        y0 = min(max(y0, 0), bottom)
+        y1 = min(max(y1, 0), bottom)
+        # Two samples per cell crossed
+        samples = int(math.hypot(x1 - x0, y1 - y0) * 2 // size) + 2
+        t = np.arange(samples) * (1.0 / (samples - 1))
+        columns = ((x0 + (x1 - x0) * t) // size).astype(np.intp)
+        columns += 1
+        rows = ((y0 + (y1 - y0) * t) // size).astype(np.intp)
+        rows += 1
+        return bool(self.walk[rows, columns].all())
+
+class PathQuery:
+    """Jump point search between two walkable cells, advanced a few nodes at a time
+
+    Diagonal steps never cut the corner of a blocked cell.
+    """
+    def __init__(self, nav, start, goal):
+        self.nav = nav
+        self.start = start
+        self.goal = goal
+        self.open = [(octile(goal[0] - start[0], goal[1] - start[1]), 0, start)]
+        self.cost = {start: 0.0}
+        self.parent = {start: None}
+        self.closed = set()
+        self.work = 0
+        self.done = False
+        self.result = None  # Jump point cells from start to goal, None if unreachable
+
+    def advance(self, budget):
+        """Expand nodes until budget more jump steps were spent, True once finished"""
+        goal = self.goal
+        open_list, cost, parent, closed = self.open, self.cost, self.parent, self.closed
+        limit = self.work + budget
+        while self.work < limit and open_list and not self.done:
+            _, _, node = heapq.heappop(open_list)
+            if node in closed:
+                continue
+            self.work += 1
+            if node == goal:
+                self.result = self.trace(node)
+                self.done = True
+                break
+            closed.add(node)
+            for successor in self.successors(node):
+                if successor in closed:
+                    continue
+                g = cost[node] + octile(successor[0] - node[0], successor[1] - node[1])
+                if g < cost.get(successor, math.inf):
+                    cost[successor] = g
+                    parent[successor] = node
+                    h = octile(goal[0] - successor[0], goal[1] - successor[1])
+                    # Ties go to the node nearer the goal
+                    heapq.heappush(open_list, (g + h, h, successor))
+                    self.work += 1
+            if self.work >= PATH_MAX_WORK:
+                self.done = True
+        if not open_list:
+            self.done = True
+        return self.done
+
+    def trace(self, node):
+        cells = []
+        while node is not None:
+            cells.append(node)
+            node = self.parent[node]
+        cells.reverse()
+        return cells
+
+    def successors(self, node):
+        found = []
+        for dx, dy in self.directions(node):
+            point = self.jump(node[0], node[1], dx, dy)
+            if point is not None:
+                found.append(point)
+        return found
+
+    def directions(self, node):
+        """Pruned directions to search from node, given the way the search came in"""
+        x, y = node
+        rows = self.nav.row_walk
+        parent = self.parent[node]
+        if parent is None:
+            directions = []
+            for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+                if rows[y + dy][x + dx]:
+                    directions.append((dx, dy))
+            for dx, dy in ((1, 1), (1, -1), (-1, 1), (-1, -1)):
+                if rows[y][x + dx] and rows[y + dy][x]:
+                    directions.append((dx, dy))
+            return directions
+        dx = (x > parent[0]) - (x < parent[0])
+        dy = (y > parent[1]) - (y < parent[1])
+        directions = []
+        if dx and dy:
+            vertical = rows[y + dy][x]
+            horizontal = rows[y][x + dx]
+            if vertical:
+                directions.append((0, dy))
+            if horizontal:
+                directions.append((dx, 0))
+            if vertical and horizontal:
+                directions.append((dx, dy))
+        elif dx:
+            ahead = rows[y][x + dx]
+            below = rows[y + 1][x]
+            above = rows[y - 1][x]
+            if ahead:
+                directions.append((dx, 0))
+                if below:
+                    directions.append((dx, 1))
+                if above:
+                    directions.append((dx, -1))
+            if below:
+                directions.append((0, 1))
+            if above:
+                directions.append((0, -1))
+        else:
+            ahead = rows[y + dy][x]
+            right = rows[y][x + 1]
+            left = rows[y][x - 1]
+            if ahead:
+                directions.append((0, dy))
+                if right:
+                    directions.append((1, dy))
+                if left:
+                    directions.append((-1, dy))
+            if right:
+                directions.append((1, 0))
+            if left:
+                directions.append((-1, 0))
+        return directions
+
+    def jump(self, x, y, dx, dy):
+        """Next jump point from (x, y) heading (dx, dy), or None"""
+        if not dy:
+            return self.jump_horizontal(x, y, dx)
+        if not dx:
+            return self.jump_vertical(x, y, dy)
+        rows = self.nav.row_walk
+        goal_x, goal_y = self.goal
+        while True:
+            if not (rows[y][x + dx] and rows[y + dy][x]):
+                return None
+            self.work += 1
+            x += dx
+            y += dy
+            if not rows[y][x]:
+                return None
+            if (x == goal_x and y == goal_y or self.jump_horizontal(x, y, dx) is not None
+                    or self.jump_vertical(x, y, dy) is not None):
+                return (x, y)
+
+    def jump_horizontal(self, x, y, dx):
+        self.work += 1
+        row = self.nav.row_walk[y]
+        goal_x, goal_y = self.goal
+        if dx > 0:
+            wall = row.find(0, x + 1)
+            stop = self.nav.forced_right[y].find(1, x + 1, wall)
+            if goal_y == y and x < goal_x < wall and (stop == -1 or goal_x < stop):
+                stop = goal_x
+        else:
+            wall = row.rfind(0, 0, x)
+            stop = self.nav.forced_left[y].rfind(1, wall + 1, x)
+            if goal_y == y and wall < goal_x < x and goal_x > stop:
+                stop = goal_x
+        return None if stop == -1 else (stop, y)
+
+    def jump_vertical(self, x, y, dy):
+        self.work += 1
+        column = self.nav.column_walk[x]
+        goal_x, goal_y = self.goal
+        if dy > 0:
+            wall = column.find(0, y + 1)
+            stop = self.nav.forced_down[x].find(1, y + 1, wall)
+            if goal_x == x and y < goal_y < wall and (stop == -1 or goal_y < stop):
+                stop = goal_y
+        else:
+            wall = column.rfind(0, 0, y)
+            stop = self.nav.forced_up[x].rfind(1, wall + 1, y)
+            if goal_x == x and wall < goal_y < y and goal_y > stop:
+                stop = goal_y
+        return None if stop == -1 else (x, stop)
+
+class PathRequest:
+    """One click-to-move query, answered on the tick its search would finish"""
+    __slots__ = ('start', 'goal', 'key', 'query', 'cells', 'ready_tick', 'ticks', 'waypoints')
+
+    def __init__(self, start, goal, key):
+        self.start = start
+        self.goal = goal
+        self.key = key
+        self.query = None
+        self.cells = None
+        self.ready_tick = None
+        self.ticks = 0
+        self.waypoints = None
+
+    @property
+    def ready(self):
+        return self.waypoints is not None
+
+class Pathfinder:
+    """Serves path requests within a per-tick budget, remembering recent answers
+
+    A cached answer becomes ready on the same tick its search took to finish,
+    so replays and resumed games see the same timing with or without the cache.
+    """
+    def __init__(self, nav, budget=PATH_BUDGET, cache_size=PATH_CACHE_SIZE):
+        self.nav = nav
+        self.budget = budget
+        self.cache_size = cache_size
+        # (start cell, goal cell) -> (jump point cells, ticks the search took)
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def request(self, start_x, start_y, goal_x, goal_y):
+        """Start a path query and spend this tick's budget on it"""
+        nav = self.nav
+        request = PathRequest((start_x, start_y), (goal_x, goal_y), None)
+        if nav.line_of_sight(start_x, start_y, goal_x, goal_y):
+            request.waypoints = [(goal_x, goal_y)]
+            return request
+        start = nav.cell_of(start_x, start_y)
+        goal = nav.cell_of(goal_x, goal_y)
+        # Inside a territory the search starts at the closest open cell, and a goal
+        # that cannot be reached becomes the closest cell that can
+        if not nav.walkable(start):
+            start = nav.nearest_walkable(start)
+        if start is not None:
+            region = nav.regions[start[1], start[0]]
+            if nav.regions[goal[1], goal[0]] != region:
+                goal = nav.nearest_walkable(goal, region)
+        if start is None or goal is None:
+            request.waypoints = [(goal_x, goal_y)]
+            return request
+        request.key = (start, goal)
+        cached = self.cache.get(request.key)
+        if cached is not None:
+            self.cache.move_to_end(request.key)
+            self.hits += 1
+            self.finish(request, *cached)
+        else:
+            self.misses += 1
+            request.query = PathQuery(nav, start, goal)
+        self.step(request)
+        return request
+
+    def finish(self, request, cells, ticks):
+        request.cells = cells
+        request.ready_tick = ticks
+
+    def step(self, request):
+        """Advance a pending request by one tick"""
+        query = request.query
+        if query is not None and query.advance(self.budget):
+            request.query = None
+            result = tuple(query.result) if query.result is not None else None
+            self.cache[request.key] = (result, request.ticks)
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+            self.finish(request, result, request.ticks)
+        if request.ready_tick is not None and request.ticks >= request.ready_tick:
+            request.waypoints = self.waypoints(request)
+        request.ticks += 1
+
+    def waypoints(self, request):
+        """World positions to walk through, skipping jump points in plain sight"""
+        if request.cells is None:
+            # Unreachable, walk straight at it as before
+            return [request.goal]
+        nav = self.nav
+        points = [nav.center(cell) for cell in request.cells[1:]]
+        points.append(request.goal)
+        path = []
+        anchor = request.start
+        i = 0
+        while i < len(points):
+            # Walk on while the next point is still in sight of the anchor
+            while i + 1 < len(points) and nav.line_of_sight(anchor[0], anchor[1], *points[i + 1]):
+                i += 1
+            anchor = points[i]
+            path.append(anchor)
+            i += 1
+        return path
+
+def main(argv=None):
+    from pygame import Rect
+
+    parser = argparse.ArgumentParser(description='Time path queries on a generated map')
+    parser.add_argument('--world', default='20000x15000', help='world size as WIDTHxHEIGHT')
+    parser.add_argument('--territories', type=int, default=10000)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    width, height = (int(value) for value in args.world.split('x'))
+    rng = random.Random(args.seed)
+    territories = [Rect(rng.randint(0, width - 120), rng.randint(30, height - 80), 120, 80)
+                   for _ in range(args.territories)]
+    start = time.perf_counter()
+    nav = NavGrid(width, height, territories)
+    print(f"nav grid {nav.columns}x{nav.rows}, {nav.walk[1:-1, 1:-1].mean():.0%} walkable, "
+          f"built in {(time.perf_counter() - start) * 1e3:.1f} ms")
+
+    # Clicks within a screen of the player, sometimes repeated as players do
+    pathfinder = Pathfinder(nav)
+    x, y = width / 2, height / 2
+    clicks = []
+    tick_times = []
+    ticks_waited = []
+    for _ in range(args.queries):
+        if clicks and rng.random() < 0.3:
+            # Clicking again before moving on
+            x, y = start_point
+            goal = clicks[-1]
+        else:
+            goal = (min(max(x + rng.uniform(-800, 800), 0), width - 1),
+                    min(max(y + rng.uniform(-600, 600), 0), height - 1))
+            clicks.append(goal)
+        start_point = (x, y)
+        begin = time.perf_counter()
+        request = pathfinder.request(x, y, *goal)
+        tick_times.append(time.perf_counter() - begin)
+        while not request.ready:
+            begin = time.perf_counter()
+            pathfinder.step(request)
+            tick_times.append(time.perf_counter() - begin)
+        ticks_waited.append(request.ticks)
+        x, y = request.waypoints[-1]
+
+    tick_times.sort()
+    p50 = tick_times[len(tick_times) // 2] * 1e3
+    p99 = tick_times[int(len(tick_times) * 0.99)] * 1e3
+    print(f"{args.queries} queries: per-tick work p50 {p50:.3f} ms, p99 {p99:.3f} ms, "
+          f"max {tick_times[-1] * 1e3:.3f} ms")
+    print(f"cache hits {pathfinder.hits}, misses {pathfinder.misses}, "
+          f"longest wait {max(ticks_waited)} ticks")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,56 @@
+"""
+Treasure Hunt - Pirate Adventure
+Author: Matheus Abrahao
+Asset preloader: reads and decodes images and sounds on a background thread
+"""
+
+import threading
+
+class Preloader:
+    """Load jobs run on a worker thread, their results installed on the main thread"""
+    def __init__(self):
+        # (load, install) pairs, load runs on the worker and install on the main thread
+        self.jobs = []
+        self.results = []
+        self.installed = 0
+        self.thread = None
+
+    def __len__(self):
+        return len(self.jobs)
+
+    def add(self, load, install=None):
+        self.jobs.append((load, install))
+
+    @property
+    def progress(self):
+        """Fraction of the jobs the worker has finished, 0.0 to 1.0"""
+        return len(self.results) / len(self.jobs) if self.jobs else 1.0
+
+    @property
+    def ready(self):
+        return self.installed == len(self.jobs)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.work, name='preload', daemon=True)
+        self.thread.start()
+
+    def work(self):
+        for load, install in self.jobs:
+            try:
+                result = load()
+            except Exception as e:
+                # A missing asset falls back to loading on first use
+                print(f"Error preloading asset: {e}")
+                install = None
+                result = None
+            # list.append is atomic, the main thread only reads what is already there
+            self.results.append((install, result))
+
+    def poll(self):
+        """Install whatever the worker finished, True once everything is in place"""
+        while self.installed < len(self.results):
+            install, result = self.results[self.installed]
+            if install is not None:
+                install(result)
+            self.installed += 1
+        return self.ready
@@ -0,0 +1,123 @@
+"""
+Treasure Hunt - Pirate Adventure
+Author: Matheus Abrahao
+Frame-time profiler: rolling per-phase timings and CSV/JSON dumps
+"""
+
+import csv
+import json
+import time
+
+PROFILE_FRAMES = 600  # 10 seconds at 60 FPS
+
+class Section:
+    """Context manager that adds its elapsed time to one profiler phase"""
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        current = self.profiler.current
+        current[self.name] = current.get(self.name, 0.0) + time.perf_counter() - self.start
+        return False
+
+class NullSection:
+    """Section that measures nothing, used when profiling is off"""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+class NullProfiler:
+    """Profiler with the same interface that records nothing"""
+    enabled = False
+
+    def __init__(self):
+        self.null_section = NullSection()
+
+    def section(self, name):
+        return self.null_section
+
+    def end_frame(self):
+        pass
+
+class FrameProfiler:
+    """Ring buffers of frame times and per-phase costs, in seconds"""
+    enabled = True
+
+    def __init__(self, size=PROFILE_FRAMES):
+        self.size = size
+        self.index = 0
+        self.count = 0  # Frames in the ring, stops at size
+        self.total = 0  # Frames recorded since start, never saturates
+        self.frame_times = [0.0] * size
+        self.phases = {}
+        self.sections = {}
+        self.current = {}
+        self.last_frame = None
+
+    def section(self, name):
+        section = self.sections.get(name)
+        if section is None:
+            section = self.sections[name] = Section(self, name)
+            self.phases[name] = [0.0] * self.size
+        return section
+
+    def end_frame(self):
+        """Close the current frame and store it in the ring buffers"""
+        now = time.perf_counter()
+        if self.last_frame is not None:
+            i = self.index
+            self.frame_times[i] = now - self.last_frame
+            current = self.current
+            for name, samples in self.phases.items():
+                samples[i] = current.get(name, 0.0)
+            self.index = (i + 1) % self.size
+            self.count = min(self.count + 1, self.size)
+            self.total += 1
+        self.last_frame = now
+        self.current.clear()
+
+    def samples(self, ring):
+        """Ring contents in recording order, oldest first"""
+        if self.count < self.size:
+            return ring[:self.count]
+        return ring[self.index:] + ring[:self.index]
+
+    def summary(self):
+        """FPS, p50/p99 frame time and mean cost per phase, in milliseconds"""
+        frames = sorted(self.samples(self.frame_times))
+        if not frames:
+            return {'fps': 0.0, 'p50': 0.0, 'p99': 0.0, 'phases': {}}
+        mean = sum(frames) / len(frames)
+        return {
+            'fps': 1.0 / mean if mean else 0.0,
+            'p50': frames[len(frames) // 2] * 1000,
+            'p99': frames[min(len(frames) - 1, int(len(frames) * 0.99))] * 1000,
+            'phases': {name: sum(self.samples(samples)) / len(frames) * 1000
+                       for name, samples in self.phases.items()}
+        }
+
+    def rows(self):
+        """One dict per recorded frame, timings in milliseconds"""
+        names = list(self.phases)
+        columns = [self.samples(self.frame_times)] + [self.samples(self.phases[n]) for n in names]
+        return [dict(zip(['frame_ms'] + names, (value * 1000 for value in values)))
+                for values in zip(*columns)]
+
+    def dump_csv(self, path):
+        rows = self.rows()
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=['frame_ms'] + list(self.phases))
+            writer.writeheader()
+            writer.writerows(rows)
+
+    def dump_json(self, path):
+        with open(path, 'w') as f:
+            json.dump({'summary': self.summary(), 'frames': self.rows()}, f, indent=1)
@@ -0,0 +1,638 @@
+"""
+Treasure Hunt - Pirate Adventure
+Author: Matheus Abrahao
+Pygame Zero rendering adapter for the headless engine
+"""
+
+import math
+from collections import OrderedDict
+
+import numpy as np
+import pygame
+from pgzero import ptext
+from pgzero.loaders import images
+from pgzero.screen import Screen
+from pygame import Rect
+
+from atlas import load_atlas
+from camera import Camera
+from engine import TICK_RATE, WIDTH, HEIGHT
+
+TEXT_CACHE_SIZE = 128
+TRAIL_DIRECTIONS = 16
+PROFILE_REFRESH = 30  # Overlay numbers are recomputed every 30 frames
+BACKGROUND_CHUNK = 512  # Side of one baked piece of the playfield
+BACKGROUND_CHUNKS = 24  # Baked pieces kept around as the camera moves
+DIRTY_MAX_RECTS = 64  # Past this many patches one full background blit is cheaper
+CULL_MARGIN = 40  # Entities this far outside the view may still overlap it
+
+class SpriteCache:
+    """Frame table for the character sprites, served from the packed atlas"""
+    def __init__(self, atlas=None):
+        self.atlas = atlas
+        self.frames = {}
+        self.missing = set()
+
+    def preload(self, frames):
+        """Resolve every frame once so drawing never goes through the image loader"""
+        for frame in frames:
+            if frame in self.frames or frame in self.missing:
+                continue
+            if self.atlas is not None and frame in self.atlas:
+                self.frames[frame] = self.atlas.get(frame)
+                continue
+            try:
+                # Frames added after the last atlas build still load one by one
+                self.frames[frame] = images.load(frame)
+            except Exception as e:
+                # Report a missing sprite once instead of on every frame
+                print(f"Error loading sprite: {e}")
+                self.missing.add(frame)
+
+    def draw(self, screen, frame, x, y):
+        """Blit a frame centered on (x, y), returns its Rect or None if frame is missing"""
+        surface = self.frames.get(frame)
+        if surface is None:
+            self.preload((frame,))
+            if frame in self.missing:
+                return None
+            surface = self.frames[frame]
+        pos = (x - surface.get_width() / 2, y - surface.get_height() / 2)
+        screen.blit(surface, pos)
+        return Rect(pos, surface.get_size())
+
+def bake_circles(half_size, circles):
+    """Render stacked circles into one transparent surface centered on its middle"""
+    size = 2 * half_size + 1
+    surface = pygame.Surface((size, size), pygame.SRCALPHA)
+    for (dx, dy), radius, color, width in circles:
+        center = (half_size + int(round(dx)), half_size + int(round(dy)))
+        pygame.draw.circle(surface, color, center, radius, width)
+    return surface
+
+class ShapeSprites:
+    """Coin, powerup and projectile visuals pre-rendered once per animation frame"""
+    def __init__(self):
+        self.surfaces = {}
+        # The bright center pulses with the coin_1..coin_3 animation
+        for i, shine in enumerate((5, 6, 4), 1):
+            self.surfaces[f'coin_{i}'] = bake_circles(11, [
+                ((1, 1), 10, (0, 0, 0, 50), 0),    # Shadow
+                ((0, 0), 10, (200, 150, 0), 0),    # Dark gold outer ring
+                ((0, 0), 8, (255, 215, 0), 0),     # Light gold inner ring
+                ((0, 0), shine, (255, 255, 150), 0),  # Bright center
+                ((0, 0), 10, (255, 255, 255), 1)   # White border
+            ])
+        # The glow ring breathes with the powerup_1..powerup_3 animation
+        for i, glow in enumerate((8, 9, 7), 1):
+            self.surfaces[f'powerup_{i}'] = bake_circles(14, [
+                ((2, 2), 12, (0, 0, 0, 60), 0),      # Shadow
+                ((0, 0), 12, (100, 150, 255), 0),    # Blue outer ring
+                ((0, 0), 10, (150, 200, 255), 0),    # Light blue inner ring
+                ((0, 0), 6, (255, 255, 255), 0),     # Bright center
+                ((0, 0), 12, (255, 255, 255), 1),    # White border
+                ((0, 0), glow, (255, 255, 100), 1)   # Glow effect
+            ])
+        # Projectiles flicker between two cores, the trail needs one surface per angle
+        for i, core in enumerate((4, 5), 1):
+            for bucket in range(TRAIL_DIRECTIONS):
+                angle = bucket * 2 * math.pi / TRAIL_DIRECTIONS
+                trail = (-math.cos(angle) * 15, -math.sin(angle) * 15)
+                self.surfaces[(f'projectile_{i}', bucket)] = bake_circles(20, [
+                    ((1, 1), 8, (0, 0, 0, 80), 0),        # Shadow
+                    ((0, 0), 8, (255, 100, 50), 0),       # Main body (orange/red)
+                    ((0, 0), core, (255, 200, 100), 0),   # Bright center
+                    ((0, 0), 8, (255, 50, 0), 1),         # Border
+                    (trail, 4, (255, 100, 50, 100), 0)    # Trail effect
+                ])
+
+    def blit(self, screen, frame, x, y):
+        """Draw a baked frame centered on (x, y) with a single blit, returns its Rect"""
+        surface = self.surfaces[frame]
+        half = surface.get_width() // 2
+        pos = (int(round(x)) - half, int(round(y)) - half)
+        screen.blit(surface, pos)
+        return Rect(pos, surface.get_size())
+
+class TextCache:
+    """LRU cache of rasterized text keyed by (text, fontsize, color, alpha)"""
+    def __init__(self, max_size=TEXT_CACHE_SIZE):
+        self.max_size = max_size
+        self.surfaces = OrderedDict()
+
+    def get(self, text, fontsize, color, alpha=1.0):
+        key = (text, fontsize, color, alpha)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            return surface
+        surface = ptext.getsurf(text, fontsize=fontsize, color=color, alpha=alpha)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_size:
+            self.surfaces.popitem(last=False)
+        return surface
+
+class Renderer:
+    """Draws a Game instance on a Pygame Zero screen"""
+    def __init__(self, game, preloader=None, dirty_mode=False):
+        self.game = game
+        self.screen = None
+        self.preloader = preloader
+        self.sprite_cache = SpriteCache()
+        self.text_cache = TextCache()
+        self.shape_sprites = ShapeSprites()
+        # Profiler overlay, toggled from the front end
+        self.show_profile = False
+        self.profile_lines = None
+        # HUD panel, re-rasterized only when what it shows changes
+        self.hud = None
+        self.hud_key = None
+        if preloader is None:
+            self.install_atlas(load_atlas())
+        else:
+            # Decoded on the preload thread, converted and indexed on this one
+            preloader.add(lambda: load_atlas(convert=False), self.install_atlas)
+        # Carregar imagem de fundo do menu
+        self.menu_bg = images.load('menu_background')
+        # Static playfield, baked off-screen in chunks once per level
+        self.background_chunks = OrderedDict()
+        self.background_version = None
+        # Camera position for the frame being drawn
+        self.offset_x = 0
+        self.offset_y = 0
+        # How far the frame is into the next simulation tick: moving things are drawn
+        # that fraction of the way from their previous tick's position, 1 draws the last tick
+        self.alpha = 1.0
+        self.camera = None
+        self.view_camera = None
+        # Dirty-rectangle mode: only what moved is restored and redrawn
+        self.dirty_mode = dirty_mode
+        self.drawn = []  # Screen rects touched by this frame's playfield drawing
+        self.previous = None  # Same for the last frame, None forces a full redraw
+        self.previous_key = None
+        self.dirty_rects = []  # Screen areas that changed this frame
+
+    def install_atlas(self, atlas):
+        if atlas is not None and pygame.display.get_surface() is not None:
+            atlas = atlas.converted()
+        self.sprite_cache.atlas = atlas
+        # Frame table built once from the animation frame lists
+        self.sprite_cache.preload(self.game.sprite_frames())
+
+    def invalidate_background(self):
+        self.background_chunks.clear()
+
+    def background_chunk(self, cx, cy):
+        """Off-screen surface with everything in one chunk of the world that never moves"""
+        game = self.game
+        if self.background_version != game.level_version:
+            self.background_chunks.clear()
+            self.background_version = game.level_version
+        key = (cx, cy)
+        chunk = self.background_chunks.get(key)
+        if chunk is not None:
+            self.background_chunks.move_to_end(key)
+            return chunk
+        left = cx * BACKGROUND_CHUNK
+        top = cy * BACKGROUND_CHUNK
+        bounds = Rect(left, top, min(BACKGROUND_CHUNK, game.world_width - left),
+                      min(BACKGROUND_CHUNK, game.world_height - top))
+        layer = Screen(pygame.Surface(bounds.size))
+        # Fundo com gradiente simulado
+        layer.fill((30, 120, 30))  # Verde mais escuro
+
+        # Adicionar textura de grama simulada, alinhada ao mundo
+        for i in range(left - left % 40, bounds.right, 40):
+            for j in range(top - top % 40, bounds.bottom, 40):
+                # Manchas de grama mais clara
+                if (i + j) % 80 == 0:
+                    layer.draw.filled_rect(Rect(i - left, j - top, 20, 20), (40, 140, 40))
+
+        # Draw enemy territories with improved visual
+        for territory in game.territories:
+            # The warning label sits above the territory
+            if not territory.inflate(80, 0).union(territory.move(0, -30)).colliderect(bounds):
+                continue
+            local = territory.move(-left, -top)
+            # Territory with simulated gradient
+            layer.draw.rect(local, (180, 50, 50, 30))
+            layer.draw.rect(local, (100, 0, 0))
+            # Danger warning
+            layer.draw.text("RIVAL PIRATES", center=(local.centerx, local.top - 15),
+                            fontsize=20, color=(255, 50, 50))
+
+        self.background_chunks[key] = layer.surface
+        if len(self.background_chunks) > BACKGROUND_CHUNKS:
+            self.background_chunks.popitem(last=False)
+        return layer.surface
+
+    def draw_background(self):
+        """Blit the baked chunks that intersect the camera view"""
+        camera = self.camera
+        for cx in range(camera.x // BACKGROUND_CHUNK,
+                        (camera.x + camera.width - 1) // BACKGROUND_CHUNK + 1):
+            for cy in range(camera.y // BACKGROUND_CHUNK,
+                            (camera.y + camera.height - 1) // BACKGROUND_CHUNK + 1):
+                self.screen.blit(self.background_chunk(cx, cy),
+                                 (cx * BACKGROUND_CHUNK - camera.x, cy * BACKGROUND_CHUNK - camera.y))
+
+    def draw_text(self, text, pos=None, center=None, fontsize=None, color=None, target=None):
+        """Blit cached text, positioned the same way as screen.draw.text"""
+        surface = self.text_cache.get(text, fontsize, color)
+        if center is not None:
+            pos = (int(round(center[0] - 0.5 * surface.get_width())),
+                   int(round(center[1] - 0.5 * surface.get_height())))
+        (target or self.screen).blit(surface, pos)
+        return Rect(pos, surface.get_size())
+
+    def hud_panel(self, score, collected_coins, total_coins, lives):
+        """Score, coins and lives panel, rebuilt only when one of them changes"""
+        key = (score, collected_coins, total_coins, lives)
+        if key == self.hud_key:
+            return self.hud
+        panel = Screen(pygame.Surface((200, 80)))
+        # Improved UI with background
+        panel.fill((0, 0, 0))
+        panel.draw.rect(Rect(0, 0, 200, 80), "white")
+
+        self.draw_text(f"Score: {score}", (10, 10), fontsize=28, color=(255, 255, 100), target=panel)
+        coin_color = (100, 255, 100) if collected_coins == total_coins else "white"
+        self.draw_text(f"Coins: {collected_coins}/{total_coins}", (10, 40), fontsize=24,
+                       color=coin_color, target=panel)
+
+        # Show lives
+        lives_text = f"Lives: {lives}/3"
+        lives_color = (255, 100, 100) if lives <= 1 else (255, 255, 255)
+        self.draw_text(lives_text, (10, 60), fontsize=20, color=lives_color, target=panel)
+
+        self.hud = panel.surface
+        self.hud_key = key
+        return self.hud
+
+    def draw(self, screen, alpha=1.0):
+        self.screen = screen
+        game = self.game
+        profiler = game.profiler
+        self.alpha = alpha
+        self.camera = self.follow_camera()
+        with profiler.section('draw'):
+            with profiler.section('draw.background'):
+                self.drawn = []
+                if game.state == "playing" and not game.countdown_active:
+                    # Same surface, camera and level as the last frame: patch it up
+                    key = (screen.surface, self.camera.x, self.camera.y, game.level_version)
+                    if (self.dirty_mode and self.previous is not None and key == self.previous_key
+                            and len(self.previous) <= DIRTY_MAX_RECTS):
+                        self.restore(self.previous)
+                    else:
+                        # A few blits of the pre-rendered playfield
+                        self.draw_background()
+                        self.previous = None
+                    self.previous_key = key
+                else:
+                    screen.fill((30, 120, 30))  # Verde mais escuro
+                    self.previous = None
+
+            if game.countdown_active:
+                self.draw_countdown()
+            elif game.state == "menu":
+                self.draw_menu()
+            elif game.state == "playing":
+                self.draw_game()
+            elif game.state == "game_over":
+                self.draw_game_over()
+
+        if self.show_profile and profiler.enabled:
+            self.draw_profile(profiler)
+
+        if game.state == "playing" and not game.countdown_active:
+            if self.previous is None:
+                self.dirty_rects = [screen.surface.get_rect()]
+            else:
+                self.dirty_rects = self.previous + self.drawn
+            self.previous = self.drawn
+        else:
+            self.dirty_rects = [screen.surface.get_rect()]
+
+    def follow_camera(self):
+        """Camera for this frame, following the interpolated player"""
+        game = self.game
+        if self.alpha >= 1.0 or game.player is None:
+            return game.camera
+        camera = self.view_camera
+        if camera is None or (camera.world_width, camera.world_height) != (game.world_width,
+                                                                           game.world_height):
+            camera = self.view_camera = Camera(WIDTH, HEIGHT, game.world_width, game.world_height)
+        camera.follow(*self.interpolate(game.player))
+        return camera
+
+    def interpolate(self, player):
+        """Player position alpha of the way through the last tick"""
+        alpha = self.alpha
+        if alpha >= 1.0:
+            return player.x, player.y
+        return (player.previous_x + (player.x - player.previous_x) * alpha,
+                player.previous_y + (player.y - player.previous_y) * alpha)
+
+    def interpolate_batch(self, batch, indices):
+        """Screen positions of some batch slots, alpha of the way through the last tick"""
+        x = batch.x[indices]
+        y = batch.y[indices]
+        if self.alpha < 1.0:
+            for current, previous in ((x, batch.previous_x[indices]), (y, batch.previous_y[indices])):
+                current -= previous
+                current *= self.alpha
+                current += previous
+        x -= self.offset_x
+        y -= self.offset_y
+        return x.tolist(), y.tolist()
+
+    def restore(self, rects):
+        """Paint the background back over last frame's drawing, copying only those areas"""
+        surface = self.screen.surface
+        bounds = surface.get_rect()
+        camera = self.camera
+        for rect in rects:
+            rect = rect.clip(bounds)
+            if not rect:
+                continue
+            left = rect.left + camera.x
+            top = rect.top + camera.y
+            for cx in range(left // BACKGROUND_CHUNK, (left + rect.width - 1) // BACKGROUND_CHUNK + 1):
+                for cy in range(top // BACKGROUND_CHUNK, (top + rect.height - 1) // BACKGROUND_CHUNK + 1):
+                    chunk = self.background_chunk(cx, cy)
+                    x = cx * BACKGROUND_CHUNK - camera.x
+                    y = cy * BACKGROUND_CHUNK - camera.y
+                    part = rect.clip(Rect((x, y), chunk.get_size()))
+                    surface.blit(chunk, part.topleft, part.move(-x, -y))
+
+    def draw_profile(self, profiler):
+        """FPS, frame-time percentiles and per-phase cost in the top right corner"""
+        if self.profile_lines is None or profiler.total % PROFILE_REFRESH == 0:
+            stats = profiler.summary()
+            self.profile_lines = [f"{stats['fps']:.0f} FPS  p50 {stats['p50']:.1f}ms  p99 {stats['p99']:.1f}ms"]
+            self.profile_lines.extend(f"{name}: {cost:.2f}ms" for name, cost in stats['phases'].items())
+        overlay = Rect(WIDTH - 250, 5, 245, 8 + 16 * len(self.profile_lines))
+        self.screen.draw.filled_rect(overlay, (0, 0, 0))
+        self.drawn.append(overlay)
+        for i, line in enumerate(self.profile_lines):
+            self.draw_text(line, (overlay.x + 6, overlay.y + 4 + 16 * i), fontsize=16, color=(150, 255, 150))
+
+    def draw_player(self, player):
+        # Blink when invincible
+        if player.invincible and player.invincible_timer % 10 < 5:
+            return
+
+        # Get current animation frame
+        current_frame = player.current_animation.frame_at(self.game.tick)
+
+        # Draw player sprite
+        x, y = self.interpolate(player)
+        x -= self.offset_x
+        y -= self.offset_y
+        drawn = self.sprite_cache.draw(self.screen, current_frame, x, y)
+        if not drawn:
+            # Fallback if images not found
+            color = (0, 120, 255) if player.current_animation == player.idle_animation else (0, 180, 255)
+            if player.powerup_active:
+                color = (255, 255, 0)  # Gold when with powerup
+
+            # Draw rectangle as fallback
+            drawn = Rect(x - 15, y - 15, 30, 30)
+            self.screen.draw.filled_rect(drawn, color)
+            self.screen.draw.rect(drawn, (255, 255, 255))
+        self.drawn.append(drawn)
+
+    def draw_enemies(self, enemies, view):
+        # Every enemy shows the same run frame
+        current_frame = enemies.animation.frame_at(self.game.tick)
+        visible = enemies.visible(view)
+        draw = self.sprite_cache.draw
+        drawn = self.drawn
+        for x, y in zip(*self.interpolate_batch(enemies, visible)):
+            enemy_rect = draw(self.screen, current_frame, x, y)
+            if not enemy_rect:
+                # Fallback if images not found
+                # Draw rectangle as fallback
+                enemy_rect = Rect(x - 12, y - 12, 25, 25)
+                self.screen.draw.filled_rect(enemy_rect, (180, 30, 30))
+                self.screen.draw.rect(enemy_rect, (100, 0, 0))
+            drawn.append(enemy_rect)
+
+    def draw_coin(self, coin):
+        if not coin.collected:
+            self.drawn.append(self.shape_sprites.blit(
+                self.screen, coin.animation.frame_at(self.game.tick),
+                coin.x - self.offset_x, coin.y - self.offset_y))
+
+    def draw_powerup(self, powerup):
+        if not powerup.collected:
+            self.drawn.append(self.shape_sprites.blit(
+                self.screen, powerup.animation.frame_at(self.game.tick),
+                powerup.x - self.offset_x, powerup.y - self.offset_y))
+
+    def draw_projectiles(self, projectiles, view):
+        frame = projectiles.animation.frame_at(self.game.tick)
+        visible = projectiles.visible(view)
+        # Trail direction snapped to one of the pre-rendered angles
+        buckets = np.rint(projectiles.direction[visible] * (TRAIL_DIRECTIONS / (2 * math.pi))).astype(int)
+        buckets %= TRAIL_DIRECTIONS
+        blit = self.shape_sprites.blit
+        drawn = self.drawn
+        for x, y, bucket in zip(*self.interpolate_batch(projectiles, visible), buckets.tolist()):
+            drawn.append(blit(self.screen, (frame, bucket), x, y))
+
+    def draw_countdown(self):
+        """Draw countdown screen"""
+        game = self.game
+        screen = self.screen
+        # Instant black background
+        overlay = Rect(0, 0, WIDTH, HEIGHT)
+        screen.draw.filled_rect(overlay, (0, 0, 0, 255))
+
+        if game.countdown_timer >= 30:
+            # Countdown number
+            if game.countdown_number > 0:
+                number_text = str(game.countdown_number)
+                color = (255, 255, 100)  # Yellow
+            else:
+                number_text = "GO!"
+                color = (100, 255, 100)  # Green
+
+            # Text shadow
+            self.draw_text(number_text, center=(WIDTH//2 + 4, HEIGHT//2 + 4),
+                           fontsize=120, color=(0, 0, 0, 150))
+            # Main text
+            self.draw_text(number_text, center=(WIDTH//2, HEIGHT//2),
+                           fontsize=120, color=color)
+
+        # Asset loading progress, the round waits for it after "GO!"
+        if self.preloader is not None and not self.preloader.ready:
+            bar = Rect(WIDTH//2 - 150, HEIGHT//2 + 110, 300, 14)
+            screen.draw.rect(bar, (200, 200, 200))
+            filled = int((bar.width - 4) * self.preloader.progress)
+            if filled:
+                screen.draw.filled_rect(Rect(bar.left + 2, bar.top + 2, filled, bar.height - 4),
+                                        (255, 215, 0))
+            self.draw_text("Loading treasure...", center=(WIDTH//2, bar.bottom + 16),
+                           fontsize=18, color=(200, 200, 200))
+
+    def draw_menu(self):
+        """Draw main menu with improved design"""
+        game = self.game
+        screen = self.screen
+        # Animated colored gradient background
+        for y in range(0, HEIGHT, 20):
+            # Vibrant color gradient
+            r = int(50 + 30 * math.sin(y * 0.01 + game.countdown_timer * 0.02))
+            g = int(100 + 40 * math.sin(y * 0.015 + game.countdown_timer * 0.03))
+            b = int(150 + 50 * math.sin(y * 0.02 + game.countdown_timer * 0.04))
+            screen.draw.filled_rect(Rect(0, y, WIDTH, 20), (r, g, b))
+
+        # Draw menu background image with transparency
+        self.screen.blit(self.menu_bg, (0, 0))
+
+        # Main title with effects
+        title = "TREASURE HUNT"
+        subtitle = "Pirate Adventure"
+
+        # Title shadow
+        self.draw_text(title, center=(WIDTH//2 + 3, 82), fontsize=48, color=(0, 0, 0, 150))
+        # Main title with gradient
+        self.draw_text(title, center=(WIDTH//2, 80), fontsize=48, color=(255, 255, 100))
+
+        # Subtitle
+        self.draw_text(subtitle, center=(WIDTH//2 + 2, 132), fontsize=28, color=(0, 0, 0, 100))
+        self.draw_text(subtitle, center=(WIDTH//2, 130), fontsize=28, color=(255, 200, 100))
+
+        # Author with style
+        author_text = "por Matheus Abrahao"
+        self.draw_text(author_text, center=(WIDTH//2, 170), fontsize=18, color=(200, 200, 200))
+
+        # Pirate/tropical theme colors
+        WOOD_COLOR = (107, 66, 38)      # #6B4226 - Wood brown
+        GOLD_COLOR = (255, 215, 0)      # #FFD700 - Gold
+        TURQUOISE_HOVER = (26, 188, 156) # #1ABC9C - Soft turquoise
+        DARK_WOOD = (75, 46, 28)        # #4B2E1C - Dark brown for borders
+
+        # Buttons with pirate/tropical theme
+        button_configs = [
+            ("START ADVENTURE", "start"),
+            ("MUSIC: " + ("ON" if game.music_on else "OFF"), "music"),
+            ("SOUND: " + ("ON" if game.sfx_on else "OFF"), "sfx"),
+            ("EXIT", "exit")
+        ]
+
+        for text, key in button_configs:
+            button = game.buttons[key]
+            is_hovered = game.button_hover == key
+
+            # Button color based on hover
+            current_color = TURQUOISE_HOVER if is_hovered else WOOD_COLOR
+
+            # Button shadow (darker for depth)
+            shadow = Rect(button.x + 3, button.y + 3, button.width, button.height)
+            screen.draw.filled_rect(shadow, (0, 0, 0, 100))
+
+            # Main button with wood color
+            screen.draw.filled_rect(button, current_color)
+
+            # Dark brown border (2px simulated)
+            border_rect = Rect(button.x - 2, button.y - 2, button.width + 4, button.height + 4)
+            screen.draw.rect(border_rect, DARK_WOOD)
+
+            # Bold gold text
+            text_color = GOLD_COLOR
+            # Text shadow for better readability
+            self.draw_text(text, center=(button.centerx + 1, button.centery + 1),
+                           fontsize=22, color=(0, 0, 0, 100))
+            # Main gold text
+            self.draw_text(text, center=button.center, fontsize=22, color=text_color)
+
+        # Instructions at bottom
+        instructions = "MOUSE: Click buttons - OBJECTIVE: Collect 10 coins - AVOID: Pirates and projectiles!"
+        self.draw_text(instructions, center=(WIDTH//2, HEIGHT - 30), fontsize=16, color=(255, 255, 255))
+
+    def draw_game(self):
+        game = self.game
+        screen = self.screen
+        profiler = game.profiler
+
+        camera = self.camera
+        self.offset_x = camera.x
+        self.offset_y = camera.y
+        # Only what the grids hold near the camera view is drawn
+        view = camera.viewport(CULL_MARGIN)
+
+        # Draw elements in depth order
+        with profiler.section('draw.entities'):
+            for coin in game.coin_grid.query_rect(view):
+                self.draw_coin(coin)
+            for powerup in game.powerup_grid.query_rect(view):
+                self.draw_powerup(powerup)
+            self.draw_enemies(game.enemies, view)
+            self.draw_projectiles(game.projectiles, view)
+            self.draw_player(game.player)
+
+        # Draw particles
+        with profiler.section('draw.particles'):
+            particles = game.particles
+            for start, end in particles.segments():
+                xs = particles.x[start:end] - self.offset_x
+                ys = particles.y[start:end] - self.offset_y
+                for x, y, color in zip(xs.tolist(), ys.tolist(), particles.color[start:end].tolist()):
+                    screen.draw.filled_circle((x, y), 2, color)
+                if end > start:
+                    # One box around the whole run, bursts stay close together
+                    left = int(xs.min()) - 3
+                    top = int(ys.min()) - 3
+                    self.drawn.append(Rect(left, top, int(xs.max()) + 4 - left, int(ys.max()) + 4 - top))
+
+        with profiler.section('draw.hud'):
+            hud = self.hud_panel(game.score, game.coins_collected, len(game.coins), game.player.lives)
+            screen.blit(hud, (5, 5))
+            self.drawn.append(Rect((5, 5), hud.get_size()))
+
+            # Show active powerup
+            if game.player.powerup_active:
+                powerup_text = f"SPEED! ({game.player.powerup_timer // TICK_RATE}s)"
+                self.drawn.append(self.draw_text(powerup_text, center=(WIDTH//2, 30), fontsize=20,
+                                                 color=(255, 255, 0)))
+
+            # Instructions in bottom corner
+            instructions = (f"MOUSE: Click to move - OBJECTIVE: Collect all {len(game.coins)} coins"
+                            " - AVOID: Pirates and projectiles!")
+            self.drawn.append(self.draw_text(instructions, center=(WIDTH//2, HEIGHT - 20), fontsize=16,
+                                             color=(200, 200, 200)))
+
+    def draw_game_over(self):
+        game = self.game
+        screen = self.screen
+        # Semi-transparent background
+        overlay = Rect(0, 0, WIDTH, HEIGHT)
+        screen.draw.filled_rect(overlay, (0, 0, 0, 150))
+
+        # Game Over with shadow and effect
+        collected_coins = game.coins_collected
+        is_victory = collected_coins == len(game.coins)
+
+        if is_victory:
+            # Victory
+            self.draw_text("TREASURE FOUND!", center=(WIDTH//2 + 3, HEIGHT//2 - 47), fontsize=50, color=(0, 0, 0, 100))
+            self.draw_text("TREASURE FOUND!", center=(WIDTH//2, HEIGHT//2 - 50), fontsize=50, color=(255, 255, 100))
+            self.draw_text("You found all treasures!", center=(WIDTH//2, HEIGHT//2 - 10), fontsize=25, color=(100, 255, 100))
+        else:
+            # Defeat
+            self.draw_text("PIRATES CAUGHT YOU!", center=(WIDTH//2 + 3, HEIGHT//2 - 47), fontsize=50, color=(0, 0, 0, 100))
+            self.draw_text("PIRATES CAUGHT YOU!", center=(WIDTH//2, HEIGHT//2 - 50), fontsize=50, color=(255, 100, 100))
+            self.draw_text("The rival pirates captured you!", center=(WIDTH//2, HEIGHT//2 - 10), fontsize=22, color=(255, 150, 150))
+
+        # Score with highlight
+        self.draw_text(f"Treasures Found: {game.score}", center=(WIDTH//2, HEIGHT//2 + 30), fontsize=30, color=(255, 255, 255))
+        self.draw_text(f"Coins Collected: {collected_coins}/{len(game.coins)}", center=(WIDTH//2, HEIGHT//2 + 60), fontsize=24, color=(255, 215, 0))
+
+        # Return button
+        button_rect = Rect(WIDTH//2 - 100, HEIGHT//2 + 100, 200, 40)
+        screen.draw.filled_rect(button_rect, (100, 150, 255))
+        screen.draw.rect(button_rect, "white")
+        self.draw_text("Click to return to port", center=button_rect.center, fontsize=20, color="white")
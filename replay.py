@@ -0,0 +1,98 @@
+"""
+Treasure Hunt - Pirate Adventure
+Author: Matheus Abrahao
+Round replays: the round seed plus every click-to-move target and its tick
+
+Re-simulate and verify a saved replay at full speed:
+    python replay.py replays/<file>.replay
+"""
+
+import struct
+import sys
+import time
+
+from level import DEFAULT_LEVEL
+from spatial import COLLISION_MODES
+
+MAGIC = b'TRRP'
+VERSION = 5
+# Magic, version, collision mode, round seed, ticks played, move count, final state hash, level name
+HEADER = struct.Struct('<4sBBIII8s16s')
+# Tick, target x, target y
+MOVE = struct.Struct('<IHH')
+
+class Replay:
+    """Level, seed, collision mode and inputs of one round, enough to re-simulate it exactly"""
+    def __init__(self, seed, level=DEFAULT_LEVEL, moves=None, ticks=0, state_hash=bytes(8),
+                 collision_mode='discrete'):
+        self.seed = seed
+        self.level = level
+        self.collision_mode = collision_mode
+        self.moves = moves if moves is not None else []
+        self.ticks = ticks
+        self.state_hash = state_hash
+
+    def record(self, tick, x, y):
+        self.moves.append((tick, int(x), int(y)))
+
+    def finish(self, ticks, state_hash):
+        self.ticks = ticks
+        self.state_hash = state_hash
+
+    def to_bytes(self):
+        header = HEADER.pack(MAGIC, VERSION, COLLISION_MODES.index(self.collision_mode), self.seed, self.ticks, len(self.moves), self.state_hash,
+                             self.level.encode())
+        return header + b''.join(MOVE.pack(*move) for move in self.moves)
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, version, mode, seed, ticks, count, state_hash, level = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION or mode >= len(COLLISION_MODES):
+            raise ValueError("Not a Treasure Hunt replay (or an unsupported version)")
+        moves = [MOVE.unpack_from(data, HEADER.size + i * MOVE.size) for i in range(count)]
+        return cls(seed, level.rstrip(b'\0').decode(), moves, ticks, state_hash,
+                   COLLISION_MODES[mode])
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())
+
+def play(replay, game=None):
+    """Re-simulate a replay headlessly as fast as possible, returns the game"""
+    if game is None:
+        from engine import Game
+        game = Game()
+    game.set_level(replay.level)
+    game.collision_mode = replay.collision_mode
+    game.start_round(replay.seed)
+    moves = replay.moves
+    next_move = 0
+    while game.tick < replay.ticks and game.state == "playing":
+        # Apply every click made before this tick, in the order it happened
+        while next_move < len(moves) and moves[next_move][0] <= game.tick:
+            _, x, y = moves[next_move]
+            game.move_player(x, y)
+            next_move += 1
+        game.update()
+    return game
+
+def verify(replay, game=None):
+    """True when re-simulating the replay lands on the recorded state hash"""
+    return play(replay, game).state_hash() == replay.state_hash
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        sys.exit("usage: python replay.py <file.replay>")
+    replay = Replay.load(sys.argv[1])
+    start = time.perf_counter()
+    game = play(replay)
+    elapsed = time.perf_counter() - start
+    ok = game.state_hash() == replay.state_hash
+    print(f"{replay.level} seed {replay.seed} ({replay.collision_mode}): {game.tick} ticks, {len(replay.moves)} moves, "
+          f"{game.tick / max(elapsed, 1e-9):.0f} ticks/s - {'OK' if ok else 'MISMATCH'}")
+    sys.exit(0 if ok else 1)
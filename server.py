@@ -0,0 +1,274 @@
+"""
+Treasure Hunt - Pirate Adventure
+Author: Matheus Abrahao
+Server mode: many headless Game sessions per process, sharded over a process pool
+
+Load-test it (sessions spread over every core, 60 ticks per second):
+    python server.py --sessions 200 --ticks 600
+"""
+
+import argparse
+import multiprocessing
+import numbers
+import os
+import time
+import zlib
+
+from engine import Game, TICK_RATE
+from level import DEFAULT_LEVEL
+
+# Client input events Session.apply understands
+EVENT_KINDS = ('click', 'move')
+
+class Session:
+    """One player's Game plus the input events queued for its next tick"""
+    def __init__(self, session_id, seed=None, level=DEFAULT_LEVEL):
+        self.session_id = session_id
+        self.game = Game(seed=seed, level=level)
+        self.game.music_on = self.game.sfx_on = False
+        self.events = []
+        # Gameplay events of the last tick, sent along with its snapshot
+        self.gameplay_events = []
+        self.game.events.listen(self.record)
+
+    def record(self, events):
+        self.gameplay_events.extend(events)
+
+    def apply(self, event):
+        """Feed one ('click'|'move', x, y) event to the game, like the front end does"""
+        kind, x, y = event
+        if kind == 'click':
+            self.game.handle_click((x, y))
+        elif kind == 'move':
+            self.game.handle_mouse_move((x, y))
+        else:
+            raise ValueError(f"Unknown event type: {kind}")
+
+    def step(self):
+        # Taken up front so a bad event is not replayed on the next tick
+        events, self.events = self.events, []
+        self.gameplay_events = []
+        for event in events:
+            self.apply(event)
+        self.game.update()
+
+class SessionHost:
+    """Scheduler that steps every session it hosts once per tick, in one process"""
+    def __init__(self):
+        # Insertion order is the stepping order, so runs are reproducible
+        self.sessions = {}
+        # Failures waiting to go out with the session's next snapshot
+        self.errors = {}
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def open(self, session_id, seed=None, level=DEFAULT_LEVEL):
+        if session_id in self.sessions:
+            raise KeyError(f"Session already open: {session_id}")
+        self.sessions[session_id] = Session(session_id, seed, level)
+
+    def close(self, session_id):
+        self.sessions.pop(session_id, None)
+
+    def send(self, session_id, event):
+        """Queue an input event, applied at the start of the session's next tick"""
+        self.sessions[session_id].events.append(event)
+
+    def report(self, session_id, error):
+        """Hold an error for the session's next snapshot instead of failing the whole host"""
+        self.errors[session_id] = f"{type(error).__name__}: {error}"
+
+    def step(self):
+        """Advance every session one tick, returns {session_id: snapshot}
+
+        Each snapshot also lists the tick's gameplay events under 'events'. A session
+        that failed this tick, or whose open/close failed, gets an 'error' message
+        instead; the other sessions are unaffected.
+        """
+        snapshots = {}
+        for session_id, session in self.sessions.items():
+            try:
+                session.step()
+                snapshot = session.game.snapshot()
+                snapshot['events'] = session.gameplay_events
+            except Exception as error:
+                self.report(session_id, error)
+                snapshot = {}
+            snapshots[session_id] = snapshot
+        for session_id, error in self.errors.items():
+            snapshots.setdefault(session_id, {})['error'] = error
+        self.errors = {}
+        return snapshots
+
+    def handle(self, command, *args):
+        """Run an 'open' or 'close' request, reporting failures to that session"""
+        try:
+            if command == 'open':
+                self.open(*args)
+            else:
+                self.close(*args)
+        except Exception as error:
+            self.report(args[0], error)
+
+def shard_worker(conn):
+    """Worker process loop: a SessionHost driven by messages from ProcessTransport"""
+    host = SessionHost()
+    while True:
+        message = conn.recv()
+        command = message[0]
+        if command == 'step':
+            # Events for this tick arrive batched with the step itself
+            for session_id, event in message[1]:
+                if session_id in host.sessions:
+                    host.send(session_id, event)
+            conn.send(host.step())
+        elif command in ('open', 'close'):
+            host.handle(*message)
+        elif command == 'stop':
+            conn.close()
+            return
+
+def shard_of(session_id, shards):
+    """Stable shard for a session id, the same in every process"""
+    return zlib.crc32(str(session_id).encode()) % shards
+
+class InMemoryTransport:
+    """Drives SessionHosts directly in this process, for tests and single-core use"""
+    def __init__(self, shards=1):
+        self.shards = shards
+        self.hosts = [SessionHost() for _ in range(shards)]
+
+    def open(self, shard, session_id, seed, level):
+        self.hosts[shard].handle('open', session_id, seed, level)
+
+    def close(self, shard, session_id):
+        self.hosts[shard].handle('close', session_id)
+
+    def step(self, events):
+        snapshots = {}
+        for host, shard_events in zip(self.hosts, events):
+            for session_id, event in shard_events:
+                if session_id in host.sessions:
+                    host.send(session_id, event)
+            snapshots.update(host.step())
+        return snapshots
+
+    def stop(self):
+        self.hosts = []
+
+class ProcessTransport:
+    """One worker process per shard, talking over pipes; all shards step in parallel"""
+    def __init__(self, shards=None):
+        self.connections = []
+        self.processes = []
+        for _ in range(shards or os.cpu_count() or 1):
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=shard_worker, args=(child,), daemon=True)
+            process.start()
+            child.close()
+            self.connections.append(parent)
+            self.processes.append(process)
+        self.shards = len(self.connections)
+
+    def open(self, shard, session_id, seed, level):
+        self.connections[shard].send(('open', session_id, seed, level))
+
+    def close(self, shard, session_id):
+        self.connections[shard].send(('close', session_id))
+
+    def step(self, events):
+        for connection, shard_events in zip(self.connections, events):
+            connection.send(('step', shard_events))
+        snapshots = {}
+        for connection in self.connections:
+            snapshots.update(connection.recv())
+        return snapshots
+
+    def stop(self):
+        for connection in self.connections:
+            connection.send(('stop',))
+            connection.close()
+        for process in self.processes:
+            process.join()
+        self.connections = []
+        self.processes = []
+
+class GameServer:
+    """Front door of the server: routes sessions and events to shards, collects snapshots"""
+    def __init__(self, transport=None):
+        self.transport = transport or ProcessTransport()
+        self.shards = self.transport.shards
+        self.pending = [[] for _ in range(self.shards)]
+        self.session_shards = {}
+
+    def open(self, session_id, seed=None, level=DEFAULT_LEVEL):
+        if session_id in self.session_shards:
+            raise KeyError(f"Session already open: {session_id}")
+        shard = shard_of(session_id, self.shards)
+        self.session_shards[session_id] = shard
+        self.transport.open(shard, session_id, seed, level)
+
+    def close(self, session_id):
+        shard = self.session_shards.pop(session_id, None)
+        if shard is not None:
+            self.transport.close(shard, session_id)
+
+    def send(self, session_id, event):
+        """Queue a client event for the next step, rejecting malformed ones here"""
+        shard = self.session_shards[session_id]
+        if (not isinstance(event, tuple) or len(event) != 3 or event[0] not in EVENT_KINDS
+                or not all(isinstance(v, numbers.Real) for v in event[1:])):
+            raise ValueError(f"Bad event for session {session_id}: {event!r}")
+        self.pending[shard].append((session_id, event))
+
+    def step(self):
+        """One tick of every session on every shard, returns {session_id: snapshot}"""
+        events = self.pending
+        self.pending = [[] for _ in range(self.shards)]
+        return self.transport.step(events)
+
+    def run(self, ticks, rate=TICK_RATE, on_snapshots=None):
+        """Step at a fixed rate (None runs flat out), returns the ticks that ran late"""
+        late = 0
+        interval = 1.0 / rate if rate else 0.0
+        deadline = time.perf_counter()
+        for _ in range(ticks):
+            snapshots = self.step()
+            if on_snapshots is not None:
+                on_snapshots(snapshots)
+            deadline += interval
+            delay = deadline - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            elif rate:
+                late += 1
+        return late
+
+    def stop(self):
+        self.transport.stop()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Host many headless game sessions')
+    parser.add_argument('--sessions', type=int, default=100)
+    parser.add_argument('--shards', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--ticks', type=int, default=600)
+    parser.add_argument('--rate', type=int, default=TICK_RATE, help='ticks per second, 0 runs flat out')
+    parser.add_argument('--in-memory', action='store_true', help='step every shard in this process')
+    args = parser.parse_args(argv)
+
+    transport = InMemoryTransport(args.shards) if args.in_memory else ProcessTransport(args.shards)
+    server = GameServer(transport)
+    for i in range(args.sessions):
+        server.open(i, seed=i)
+        # Press "start" so every session runs its countdown and a round
+        server.send(i, ('click', 400, 255))
+    start = time.perf_counter()
+    late = server.run(args.ticks, args.rate or None)
+    elapsed = time.perf_counter() - start
+    server.stop()
+    print(f"{args.sessions} sessions on {server.shards} shards: {args.ticks} ticks in {elapsed:.2f}s "
+          f"({args.sessions * args.ticks / elapsed:.0f} session-ticks/s, {late} late ticks)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,420 @@
+"""
+Treasure Hunt - Pirate Adventure
+Author: Matheus Abrahao
+State snapshots: exact keyframes for save/resume, compact per-tick deltas for sync
+
+Round-trip check plus encode/decode throughput at a given entity count:
+    python snapshot.py --entities 10000 --ticks 300
+"""
+
+import argparse
+import struct
+import sys
+import time
+import zlib
+
+import numpy as np
+
+from spatial import COLLISION_MODES
+
+MAGIC = b'TRSN'
+VERSION = 5
+KEYFRAME = ord('K')
+DELTA = ord('D')
+KEYFRAME_INTERVAL = 120  # Ticks between keyframes, a late joiner waits at most this long
+QUANT = 8  # Delta positions are sent in 1/8 pixel steps
+ESCAPE = -32768  # Residual too big for int16, the absolute value follows
+COMPRESS_LEVEL = 1
+STATES = ('menu', 'playing', 'game_over')
+
+# Magic, version, kind
+FRAME = struct.Struct('<4sBB')
+# Tick, round seed, state, countdown active/timer/number, fade, score, coins collected,
+# level name, enemy/coin/powerup/projectile/move counts, collision mode
+GAME = struct.Struct('<IIBBHbBII16sIIIIIB')
+# Position, target, speed, moving, direction, lives, invincible + timer, powerup + timer, running
+PLAYER = struct.Struct('<5dBbbBhBhB')
+# PCG64 state and increment (128 bits each), buffered uint32 flag and value
+PCG64 = struct.Struct('<16s16sBI')
+MOVE = struct.Struct('<IHH')
+# Pending path request: start, goal, ticks it has been searching (0 when none)
+PATH_REQUEST = struct.Struct('<4dI')
+# Tick, state, flags, countdown number, score, coins collected, lives, player x/y (quantized)
+VIEW = struct.Struct('<IBBbIIbii')
+
+def quantize(values):
+    return np.rint(np.asarray(values, dtype=np.float64) * QUANT).astype(np.int32)
+
+def pack_bits(flags):
+    return np.packbits(np.asarray(flags, dtype=bool)).tobytes()
+
+def unpack_bits(data, offset, count):
+    size = (count + 7) // 8
+    bits = np.unpackbits(np.frombuffer(data, np.uint8, size, offset))[:count].astype(bool)
+    return bits, offset + size
+
+def read_array(data, offset, dtype, count):
+    array = np.frombuffer(data, dtype, count, offset)
+    return array, offset + array.nbytes
+
+class SnapshotView:
+    """What a spectator sees: scalars plus quantized positions and collected flags"""
+    __slots__ = ('tick', 'state', 'flags', 'countdown', 'score', 'coins_collected', 'lives',
+                 'player', 'enemies', 'coins', 'powerups', 'projectiles')
+    # flags bits
+    COUNTDOWN = 1
+    INVINCIBLE = 2
+    POWERUP = 4
+
+    def __init__(self, tick, state, flags, countdown, score, coins_collected, lives,
+                 player, enemies, coins, powerups, projectiles):
+        self.tick = tick
+        self.state = state
+        self.flags = flags
+        self.countdown = countdown
+        self.score = score
+        self.coins_collected = coins_collected
+        self.lives = lives
+        self.player = player  # (x, y) in 1/QUANT pixels
+        self.enemies = enemies  # (n, 2) int32 in 1/QUANT pixels
+        self.coins = coins  # bool per coin, True once collected
+        self.powerups = powerups
+        self.projectiles = projectiles  # (n, 2) int32 in 1/QUANT pixels
+
+    @classmethod
+    def of(cls, game):
+        player = game.player
+        flags = ((cls.COUNTDOWN if game.countdown_active else 0) |
+                 (cls.INVINCIBLE if player.invincible else 0) |
+                 (cls.POWERUP if player.powerup_active else 0))
+        return cls(game.tick, STATES.index(game.state), flags, game.countdown_number, game.score,
+                   game.coins_collected, player.lives, tuple(quantize((player.x, player.y)).tolist()),
+                   quantize(np.column_stack((game.enemies.x, game.enemies.y))).reshape(-1, 2),
+                   np.array([coin.collected for coin in game.coins], dtype=bool),
+                   np.array([powerup.collected for powerup in game.powerups], dtype=bool),
+                   quantize(np.column_stack((game.projectiles.x, game.projectiles.y))).reshape(-1, 2))
+
+    def header(self):
+        return VIEW.pack(self.tick, self.state, self.flags, self.countdown, self.score,
+                         self.coins_collected, self.lives, *self.player)
+
+    def positions(self, name):
+        """Pixel positions of 'enemies' or 'projectiles' as an (n, 2) float array"""
+        return getattr(self, name) / QUANT
+
+    def __eq__(self, other):
+        return (self.header() == other.header() and
+                all(np.array_equal(getattr(self, name), getattr(other, name))
+                    for name in ('enemies', 'coins', 'powerups', 'projectiles')))
+
+def encode_keyframe(game):
+    """Exact state of a game, enough to resume it tick-for-tick"""
+    player = game.player
+    projectiles = game.projectiles
+    moves = game.replay.moves
+    parts = [GAME.pack(game.tick, game.round_seed, STATES.index(game.state), game.countdown_active,
+                       game.countdown_timer, game.countdown_number, game.fade_alpha, game.score,
+                       game.coins_collected, game.level_name.encode(), len(game.enemies),
+                       len(game.coins), len(game.powerups), len(projectiles), len(moves),
+                       COLLISION_MODES.index(game.collision_mode)),
+             PLAYER.pack(player.x, player.y, player.target_x, player.target_y, player.speed,
+                         player.is_moving, player.direction, player.lives, player.invincible,
+                         player.invincible_timer, player.powerup_active, player.powerup_timer,
+                         player.current_animation is player.run_animation)]
+    enemies = game.enemies
+    parts.extend(pack_pcg64(batch.rng) for batch in (enemies, projectiles))
+    for name in ('x', 'y', 'direction'):
+        parts.append(getattr(enemies, name).astype('<f8').tobytes())
+    parts.append(enemies.turn_timer.astype('<i4').tobytes())
+    parts.append(pack_bits([coin.collected for coin in game.coins]))
+    parts.append(pack_bits([powerup.collected for powerup in game.powerups]))
+    for name in ('x', 'y', 'direction', 'speed', 'vx', 'vy'):
+        parts.append(getattr(projectiles, name).astype('<f8').tobytes())
+    parts.extend(MOVE.pack(*move) for move in moves)
+    parts.append(struct.pack('<I', len(player.path)))
+    parts.append(np.array(player.path, dtype='<f8').tobytes())
+    request = game.path_request
+    parts.append(PATH_REQUEST.pack(*request.start, *request.goal, request.ticks)
+                 if request is not None else bytes(PATH_REQUEST.size))
+    return b''.join(parts)
+
+def pack_pcg64(rng):
+    state = rng.bit_generator.state
+    return PCG64.pack(state['state']['state'].to_bytes(16, 'little'),
+                      state['state']['inc'].to_bytes(16, 'little'),
+                      state['has_uint32'], state['uinteger'])
+
+def read_pcg64(data, offset):
+    state, inc, has_uint32, uinteger = PCG64.unpack_from(data, offset)
+    return {'bit_generator': 'PCG64',
+            'state': {'state': int.from_bytes(state, 'little'), 'inc': int.from_bytes(inc, 'little')},
+            'has_uint32': has_uint32, 'uinteger': uinteger}, offset + PCG64.size
+
+def read_keyframe(data):
+    """Fields of an encoded keyframe, arrays as read-only views over data"""
+    fields = dict(zip(('tick', 'round_seed', 'state', 'countdown_active', 'countdown_timer',
+                       'countdown_number', 'fade_alpha', 'score', 'coins_collected', 'level',
+                       'enemy_count', 'coin_count', 'powerup_count', 'projectile_count',
+                       'move_count', 'collision_mode'), GAME.unpack_from(data)))
+    fields['level'] = fields['level'].rstrip(b'\0').decode()
+    fields['collision_mode'] = COLLISION_MODES[fields['collision_mode']]
+    offset = GAME.size
+    fields['player'] = PLAYER.unpack_from(data, offset)
+    offset += PLAYER.size
+    fields['enemy_rng'], offset = read_pcg64(data, offset)
+    fields['projectile_rng'], offset = read_pcg64(data, offset)
+    n = fields['enemy_count']
+    for name in ('x', 'y', 'direction'):
+        fields['enemy_' + name], offset = read_array(data, offset, '<f8', n)
+    fields['enemy_timers'], offset = read_array(data, offset, '<i4', n)
+    fields['coins'], offset = unpack_bits(data, offset, fields['coin_count'])
+    fields['powerups'], offset = unpack_bits(data, offset, fields['powerup_count'])
+    m = fields['projectile_count']
+    for name in ('x', 'y', 'direction', 'speed', 'vx', 'vy'):
+        fields['projectile_' + name], offset = read_array(data, offset, '<f8', m)
+    fields['moves'] = [MOVE.unpack_from(data, offset + i * MOVE.size)
+                       for i in range(fields['move_count'])]
+    offset += fields['move_count'] * MOVE.size
+    (count,) = struct.unpack_from('<I', data, offset)
+    path, offset = read_array(data, offset + 4, '<f8', count * 2)
+    fields['path'] = [tuple(point) for point in path.reshape(count, 2).tolist()]
+    fields['path_request'] = PATH_REQUEST.unpack_from(data, offset)
+    return fields
+
+def view_of_keyframe(fields):
+    player = fields['player']
+    flags = ((SnapshotView.COUNTDOWN if fields['countdown_active'] else 0) |
+             (SnapshotView.INVINCIBLE if player[8] else 0) |
+             (SnapshotView.POWERUP if player[10] else 0))
+    return SnapshotView(fields['tick'], fields['state'], flags, fields['countdown_number'],
+                        fields['score'], fields['coins_collected'], player[7],
+                        tuple(quantize(player[:2]).tolist()),
+                        quantize(np.column_stack((fields['enemy_x'], fields['enemy_y']))).reshape(-1, 2),
+                        fields['coins'].copy(), fields['powerups'].copy(),
+                        quantize(np.column_stack((fields['projectile_x'],
+                                                  fields['projectile_y']))).reshape(-1, 2))
+
+def restore(game, data):
+    """Load an exact keyframe (payload of encode_keyframe) into game"""
+    fields = read_keyframe(data)
+    game.set_level(fields['level'])
+    game.collision_mode = fields['collision_mode']
+    # Rebuilds the round layout from its seed, then every moving part is overwritten
+    game.init_game(fields['round_seed'])
+    counts = (len(game.enemies), len(game.coins), len(game.powerups), len(game.projectiles))
+    if counts != (fields['enemy_count'], fields['coin_count'], fields['powerup_count'],
+                  fields['projectile_count']):
+        raise ValueError("Snapshot was taken from a game with different entity counts")
+    game.tick = fields['tick']
+    game.state = STATES[fields['state']]
+    game.countdown_active = bool(fields['countdown_active'])
+    game.countdown_timer = fields['countdown_timer']
+    game.countdown_number = fields['countdown_number']
+    game.fade_alpha = fields['fade_alpha']
+    game.score = fields['score']
+    game.coins_collected = fields['coins_collected']
+    player = game.player
+    (player.x, player.y, player.target_x, player.target_y, player.speed, is_moving,
+     player.direction, player.lives, invincible, player.invincible_timer, powerup_active,
+     player.powerup_timer, running) = fields['player']
+    player.previous_x = player.x
+    player.previous_y = player.y
+    player.is_moving = bool(is_moving)
+    player.invincible = bool(invincible)
+    player.powerup_active = bool(powerup_active)
+    player.current_animation = player.run_animation if running else player.idle_animation
+    enemies = game.enemies
+    for name in ('x', 'y', 'direction'):
+        getattr(enemies, name)[:] = fields['enemy_' + name]
+    enemies.turn_timer[:] = fields['enemy_timers']
+    enemies.rng.bit_generator.state = fields['enemy_rng']
+    enemies.index_grid()
+    for coin, collected in zip(game.coins, fields['coins'].tolist()):
+        coin.collected = collected
+    for powerup, collected in zip(game.powerups, fields['powerups'].tolist()):
+        powerup.collected = collected
+    projectiles = game.projectiles
+    for name in ('x', 'y', 'direction', 'speed', 'vx', 'vy'):
+        getattr(projectiles, name)[:] = fields['projectile_' + name]
+    projectiles.rng.bit_generator.state = fields['projectile_rng']
+    projectiles.index_grid()
+    game.replay.moves = list(fields['moves'])
+    player.path = fields['path']
+    *ends, ticks = fields['path_request']
+    if ticks:
+        # Searching again from the click lands on the same tick as the original
+        game.path_request = request = game.pathfinder.request(*ends)
+        for _ in range(ticks - 1):
+            game.pathfinder.step(request)
+    game.build_grids()
+    game.camera.follow(player.x, player.y)
+    return game
+
+def encode_residuals(current, previous, before):
+    """int16 residuals against a linear prediction, plus escapes for big jumps"""
+    predicted = previous if before is None else 2 * previous.astype(np.int64) - before
+    residual = current.astype(np.int64) - predicted
+    fits = np.abs(residual).max(axis=1, initial=0) < 32767 if len(residual) else np.ones(0, bool)
+    packed = np.where(fits[:, None], residual, ESCAPE).astype('<i2')
+    escaped = np.flatnonzero(~fits).astype('<u4')
+    return b''.join((packed.tobytes(), struct.pack('<I', len(escaped)), escaped.tobytes(),
+                     current[escaped].astype('<i4').tobytes()))
+
+def decode_residuals(data, offset, previous, before):
+    n = len(previous)
+    residual, offset = read_array(data, offset, '<i2', n * 2)
+    residual = residual.reshape(n, 2)
+    predicted = previous if before is None else 2 * previous.astype(np.int64) - before
+    current = (predicted + residual).astype(np.int32)
+    (count,) = struct.unpack_from('<I', data, offset)
+    escaped, offset = read_array(data, offset + 4, '<u4', count)
+    absolute, offset = read_array(data, offset, '<i4', count * 2)
+    current[escaped] = absolute.reshape(count, 2)
+    return current, offset
+
+class SnapshotEncoder:
+    """Turns successive ticks of one game into keyframe and delta frames"""
+    def __init__(self, keyframe_interval=KEYFRAME_INTERVAL):
+        self.keyframe_interval = keyframe_interval
+        self.view = None  # What the decoder holds after the last frame
+        self.before = None  # Positions one frame earlier, for the linear prediction
+        self.round = None
+        self.since_keyframe = 0
+
+    def encode(self, game):
+        view = SnapshotView.of(game)
+        round_key = (game.round_seed, game.level_name, len(view.enemies), len(view.coins),
+                     len(view.powerups), len(view.projectiles))
+        if (self.view is None or round_key != self.round or
+                self.since_keyframe >= self.keyframe_interval):
+            self.round = round_key
+            self.since_keyframe = 0
+            self.before = None
+            data = encode_keyframe(game)
+            # The decoder rebuilds its view from the exact values, so do the same here
+            self.view = view_of_keyframe(read_keyframe(data))
+            return FRAME.pack(MAGIC, VERSION, KEYFRAME) + zlib.compress(data, COMPRESS_LEVEL)
+        previous = self.view
+        body = b''.join((
+            view.header(),
+            np.bitwise_xor(np.packbits(view.coins), np.packbits(previous.coins)).tobytes(),
+            np.bitwise_xor(np.packbits(view.powerups), np.packbits(previous.powerups)).tobytes(),
+            encode_residuals(view.enemies, previous.enemies, self.before and self.before[0]),
+            encode_residuals(view.projectiles, previous.projectiles, self.before and self.before[1])
+        ))
+        self.before = (previous.enemies, previous.projectiles)
+        self.view = view
+        self.since_keyframe += 1
+        return FRAME.pack(MAGIC, VERSION, DELTA) + zlib.compress(body, COMPRESS_LEVEL)
+
+class SnapshotDecoder:
+    """Rebuilds the SnapshotView of every tick from a stream of encoded frames"""
+    def __init__(self):
+        self.view = None
+        self.before = None
+        self.keyframe = None  # Payload of the last keyframe, for resuming a Game from it
+
+    def decode(self, frame):
+        magic, version, kind = FRAME.unpack_from(frame)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a Treasure Hunt snapshot (or an unsupported version)")
+        data = zlib.decompress(frame[FRAME.size:])
+        if kind == KEYFRAME:
+            self.keyframe = data
+            self.view = view_of_keyframe(read_keyframe(data))
+            self.before = None
+            return self.view
+        if self.view is None:
+            raise ValueError("Delta frame before any keyframe")
+        previous = self.view
+        header = VIEW.unpack_from(data)
+        offset = VIEW.size
+        coins, offset = unpack_bits(data, offset, len(previous.coins))
+        powerups, offset = unpack_bits(data, offset, len(previous.powerups))
+        enemies, offset = decode_residuals(data, offset, previous.enemies,
+                                           self.before and self.before[0])
+        projectiles, offset = decode_residuals(data, offset, previous.projectiles,
+                                               self.before and self.before[1])
+        self.before = (previous.enemies, previous.projectiles)
+        self.view = SnapshotView(*header[:7], header[7:], enemies, coins ^ previous.coins,
+                                 powerups ^ previous.powerups, projectiles)
+        return self.view
+
+def save(game, path):
+    with open(path, 'wb') as f:
+        f.write(FRAME.pack(MAGIC, VERSION, KEYFRAME) + zlib.compress(encode_keyframe(game)))
+
+def load(path, game=None):
+    """Resume a saved game, into a fresh Game unless one is given"""
+    if game is None:
+        from engine import Game
+        game = Game()
+    with open(path, 'rb') as f:
+        frame = f.read()
+    magic, version, kind = FRAME.unpack_from(frame)
+    if magic != MAGIC or version != VERSION or kind != KEYFRAME:
+        raise ValueError("Not a Treasure Hunt save (or an unsupported version)")
+    return restore(game, zlib.decompress(frame[FRAME.size:]))
+
+def main(argv=None):
+    import random
+    from engine import Game
+
+    parser = argparse.ArgumentParser(description='Check and time snapshot encoding')
+    parser.add_argument('--entities', type=int, default=None,
+                        help='enemies, coins and projectiles each (default: the stock level)')
+    parser.add_argument('--ticks', type=int, default=300)
+    parser.add_argument('--seed', type=int, default=1234)
+    args = parser.parse_args(argv)
+
+    n = args.entities
+    game = Game(seed=args.seed, enemy_count=n, coin_count=n, projectile_count=n)
+    game.sfx_on = game.music_on = False
+    game.start_round()
+    inputs = random.Random(args.seed)
+    encoder = SnapshotEncoder()
+    decoder = SnapshotDecoder()
+    frames = []
+    encode_time = decode_time = 0.0
+    mismatches = 0
+    for _ in range(args.ticks):
+        if game.state != "playing":
+            game.start_round()
+        if game.tick % 45 == 0:
+            game.move_player(inputs.randint(0, game.world_width), inputs.randint(0, game.world_height))
+        game.update()
+        start = time.perf_counter()
+        frame = encoder.encode(game)
+        encode_time += time.perf_counter() - start
+        start = time.perf_counter()
+        view = decoder.decode(frame)
+        decode_time += time.perf_counter() - start
+        frames.append(frame)
+        if not view == SnapshotView.of(game):
+            mismatches += 1
+
+    # Resume a copy from the last keyframe and check it stays in lockstep
+    resumed = restore(Game(enemy_count=n, coin_count=n, projectile_count=n), encode_keyframe(game))
+    resumed.sfx_on = resumed.music_on = False
+    for _ in range(120):
+        if game.state != "playing":
+            break
+        game.update()
+        resumed.update()
+    in_lockstep = resumed.state_hash() == game.state_hash()
+
+    keyframes = [len(f) for f in frames if f[FRAME.size - 1] == KEYFRAME]
+    deltas = [len(f) for f in frames if f[FRAME.size - 1] == DELTA]
+    total = sum(len(f) for f in frames)
+    print(f"{len(game.enemies)} enemies, {len(game.coins)} coins, {len(game.projectiles)} projectiles")
+    print(f"keyframe {sum(keyframes) / max(len(keyframes), 1):9.0f} B   "
+          f"delta {sum(deltas) / max(len(deltas), 1):9.0f} B/tick avg")
+    print(f"encode {encode_time / args.ticks * 1e6:9.1f} us/tick   "
+          f"decode {decode_time / args.ticks * 1e6:9.1f} us/tick   "
+          f"({total / 1e6 / max(decode_time, 1e-9):.1f} MB/s decoded)")
+    print(f"round trip: {'OK' if not mismatches else f'{mismatches} MISMATCHES'}   "
+          f"resume: {'OK' if in_lockstep else 'MISMATCH'}")
+    return 0 if not mismatches and in_lockstep else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""
+Treasure Hunt - Pirate Adventure
+Author: Matheus Abrahao
+Uniform grid broad-phase used by the collision checks
+"""
+
+CELL_SIZE = 64
+# 'discrete' tests overlap at the end of each tick, 'swept' along the whole tick's motion
+COLLISION_MODES = ('discrete', 'swept')
+
+def sweep_distance_sq(x0, y0, x1, y1, ox0, oy0, ox1, oy1):
+    """Closest squared distance between two points moving in straight lines over one tick"""
+    # The other point seen from the mover: it starts at w and moves by v
+    wx = ox0 - x0
+    wy = oy0 - y0
+    vx = (ox1 - ox0) - (x1 - x0)
+    vy = (oy1 - oy0) - (y1 - y0)
+    speed_sq = vx*vx + vy*vy
+    t = 0.0
+    if speed_sq > 0:
+        t = min(max(-(wx*vx + wy*vy) / speed_sq, 0.0), 1.0)
+    dx = wx + vx*t
+    dy = wy + vy*t
+    return dx*dx + dy*dy
+
+class SpatialGrid:
+    """Spatial hash that buckets entities by the grid cell of their position"""
+    def __init__(self, cell_size=CELL_SIZE):
+        self.cell_size = cell_size
+        # Cell -> entities in insertion order (dict used as an ordered set)
+        self.cells = {}
+        self.entity_cells = {}
+
+    def __len__(self):
+        return len(self.entity_cells)
+
+    def cell_of(self, x, y):
+        return (int(x // self.cell_size), int(y // self.cell_size))
+
+    def clear(self):
+        self.cells = {}
+        self.entity_cells = {}
+
+    def insert(self, entity):
+        self.insert_cell(entity, self.cell_of(entity.x, entity.y))
+
+    def insert_cell(self, item, cell):
+        self.entity_cells[item] = cell
+        self.cells.setdefault(cell, {})[item] = None
+
+    def remove(self, entity):
+        cell = self.entity_cells.pop(entity, None)
+        if cell is None:
+            return
+        bucket = self.cells[cell]
+        del bucket[entity]
+        if not bucket:
+            del self.cells[cell]
+
+    def move(self, entity):
+        """Re-bucket an entity, only touching the grid when it changed cell"""
+        size = self.cell_size
+        cell = (int(entity.x // size), int(entity.y // size))
+        if cell != self.entity_cells[entity]:
+            self.move_cell(entity, cell)
+
+    def move_cell(self, item, cell):
+        """Move an item whose new cell was computed by the caller"""
+        old_cell = self.entity_cells[item]
+        bucket = self.cells[old_cell]
+        del bucket[item]
+        if not bucket:
+            del self.cells[old_cell]
+        self.entity_cells[item] = cell
+        self.cells.setdefault(cell, {})[item] = None
+
+    def query_cells(self, x, y, radius):
+        """Items in every cell overlapping the square around (x, y)"""
+        size = self.cell_size
+        found = []
+        cells = self.cells
+        for cx in range(int((x - radius) // size), int((x + radius) // size) + 1):
+            for cy in range(int((y - radius) // size), int((y + radius) // size) + 1):
+                bucket = cells.get((cx, cy))
+                if bucket is not None:
+                    found.extend(bucket)
+        return found
+
+    def query_rect(self, rect):
+        """Items in every cell overlapping a pygame Rect"""
+        size = self.cell_size
+        found = []
+        cells = self.cells
+        for cx in range(rect.left // size, (rect.right - 1) // size + 1):
+            for cy in range(rect.top // size, (rect.bottom - 1) // size + 1):
+                bucket = cells.get((cx, cy))
+                if bucket is not None:
+                    found.extend(bucket)
+        return found
+
+    def query_sweep(self, x0, y0, x1, y1, radius):
+        """Entities within radius of the segment from (x0, y0) to (x1, y1)"""
+        radius_sq = radius * radius
+        # Square around the segment's midpoint that holds the whole swept circle
+        reach = max(abs(x1 - x0), abs(y1 - y0)) / 2 + radius
+        found = []
+        for entity in self.query_cells((x0 + x1) / 2, (y0 + y1) / 2, reach):
+            x = entity.x
+            y = entity.y
+            if sweep_distance_sq(x0, y0, x1, y1, x, y, x, y) < radius_sq:
+                found.append(entity)
+        return found
+
+    def query(self, x, y, radius):
+        """Entities within radius of (x, y), compared by squared distance"""
+        radius_sq = radius * radius
+        found = []
+        for entity in self.query_cells(x, y, radius):
+            dx = x - entity.x
+            dy = y - entity.y
+            if dx*dx + dy*dy < radius_sq:
+                found.append(entity)
+        return found
@@ -0,0 +1,93 @@
+"""
+Treasure Hunt - Pirate Adventure
+Author: Matheus Abrahao
+Fixed-step simulation clock: any frame rate runs the same ticks, frames interpolate between them
+
+Check that 30, 60 and 144 Hz frames play the same round:
+    python timestep.py --seconds 30 --rates 30 60 144
+"""
+
+import argparse
+import random
+import sys
+
+MAX_TICKS_PER_FRAME = 8  # Further behind than this and the backlog is dropped
+EPSILON = 1e-6  # Frame times summing to a whole tick still count as one
+
+class FixedStepClock:
+    """Accumulates frame times and hands them out as whole simulation ticks
+
+    What is left over is how far the frame is into the next tick: the renderer
+    draws that fraction of the way from the previous tick's positions to the
+    current ones, so motion stays smooth at any frame rate.
+    """
+    def __init__(self, tick_rate, max_ticks=MAX_TICKS_PER_FRAME):
+        self.tick_rate = tick_rate
+        self.max_ticks = max_ticks
+        self.pending = 0.0  # Ticks owed, including the fraction of the next one
+
+    def advance(self, dt):
+        """Number of ticks to run for a frame that took dt seconds"""
+        self.pending += dt * self.tick_rate
+        ticks = int(self.pending + EPSILON)
+        self.pending = max(self.pending - ticks, 0.0)
+        if ticks > self.max_ticks:
+            # A hitch (loading, a dragged window): catch up a little, don't spiral
+            ticks = self.max_ticks
+        return ticks
+
+    @property
+    def alpha(self):
+        """Fraction of the next tick already elapsed, 0 draws the last tick as is"""
+        return min(self.pending, 1.0)
+
+    def reset(self):
+        self.pending = 0.0
+
+def main(argv=None):
+    from engine import TICK_RATE, Game
+
+    parser = argparse.ArgumentParser(description='Play one round at several frame rates')
+    parser.add_argument('--seconds', type=float, default=30.0)
+    parser.add_argument('--rates', type=int, nargs='+', default=[30, 60, 144])
+    parser.add_argument('--jitter', type=float, default=0.25, help='frame time noise, as a fraction')
+    parser.add_argument('--seed', type=int, default=1234)
+    args = parser.parse_args(argv)
+
+    runs = []
+    for rate in args.rates:
+        game = Game(seed=args.seed)
+        game.sfx_on = game.music_on = False
+        game.start_round()
+        clock = FixedStepClock(TICK_RATE)
+        inputs = random.Random(args.seed)
+        noise = random.Random(rate)
+        # State hash at the end of every simulated second
+        hashes = []
+        elapsed = 0.0
+        frames = 0
+        while elapsed < args.seconds and game.state == "playing":
+            dt = (1 + noise.uniform(-args.jitter, args.jitter)) / rate
+            elapsed += dt
+            frames += 1
+            for _ in range(clock.advance(dt)):
+                if game.state != "playing":
+                    break
+                # Clicks land on the same ticks whatever the frame rate
+                if game.tick % 45 == 0:
+                    game.move_player(inputs.randint(0, game.world_width),
+                                     inputs.randint(0, game.world_height))
+                game.update()
+                if game.tick % TICK_RATE == 0:
+                    hashes.append(game.state_hash())
+        runs.append(hashes)
+        print(f"{rate:4d} Hz: {frames} frames, {game.tick} ticks in {elapsed:.2f} s, {game.state}, "
+              f"score {game.score}")
+    # Frame time noise may leave the rates a tick apart at the end, not on the way
+    seconds = min(len(hashes) for hashes in runs)
+    same = all(hashes[:seconds] == runs[0][:seconds] for hashes in runs)
+    print(f"{seconds} s of identical gameplay at every rate: {'OK' if same else 'MISMATCH'}")
+    return 0 if same else 1
+
+if __name__ == '__main__':
+    sys.exit(main())